@@ -1,8 +1,9 @@
 from collections import deque
 
+import numpy as np
 from env.ultimate_ttt import UltimateTTT
 from jax import jit, random
-from utils.alphazero_utils import get_move_probs
+from utils.alphazero_utils import create_forward, evaluate_states, get_move_probs
 from utils.test_utils import generate_random_game
 
 from alphazero.model import create_model, init_model
@@ -58,6 +59,27 @@ class AlphaZero:
         return self.traj_record
 
 
+class ValueHeadEvaluator:
+    '''
+    the value head of the network as an evaluator of cut-off roll-outs, see mcts.array_tree.ArrayTree
+    the features are rebuilt from the history of the states as in training, the values are clipped to [-1, 1];
+    a pickled evaluator rebuilds the network from its parameters, so the worker processes of MCTS use it too
+    '''
+
+    def __init__(self, model_params, model_state) -> None:
+        self.forward_func = create_forward(model_params, model_state)
+
+    def __call__(self, state: dict):
+        return float(self.batch([state])[0])
+
+    def batch(self, states: list):
+        '''
+        return the values of the states for their players to move, evaluated in one forward pass
+        '''
+        values, _ = evaluate_states(self.forward_func, states)
+        return np.clip(values, -1., 1.)
+
+
 def main():
     model = create_model(True)
     params, state = init_model(model)
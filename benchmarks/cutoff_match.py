@@ -0,0 +1,52 @@
+import argparse
+
+from mcts.core import MCTS
+from players.mcts_player import MCTSPlayer
+from players.random_player import RandomPlayer
+from tabulate import tabulate
+from utils.test_utils import generate_random_game
+
+from benchmarks.rave_match import OPENING_PLIES, play_match
+
+
+def search_stats(cutoff: int, time_limit: float):
+    '''
+    return the statistics of a search of time_limit seconds from an opening with the cutoff
+    '''
+    mcts = MCTS(generate_random_game(OPENING_PLIES, 0), RandomPlayer(), 1.4, cutoff=cutoff)
+    mcts.run_simulation(time_limit=time_limit)
+    return mcts.stats
+
+
+def benchmark(cutoffs: list = (4, 8, 16), num_games: int = 20, time_limit: float = 0.3):
+    '''
+    play MCTS with cut-off roll-outs scored by the static evaluation against MCTS with full roll-outs
+    at equal time per move
+    return a list of (cutoff, roll-out length, simulations per second, wins, losses, ties, score),
+    the first row being the full roll-outs
+    '''
+    stats = search_stats(None, time_limit)
+    records = [('none', stats.roll_out_length, stats.simulations_per_second, '', '', '', '')]
+    for cutoff in cutoffs:
+        stats = search_stats(cutoff, time_limit)
+        player = MCTSPlayer(num_simulation=None, time_limit=time_limit, cutoff=cutoff)
+        opponent = MCTSPlayer(num_simulation=None, time_limit=time_limit)
+        wins, losses, ties = play_match(player, opponent, num_games)
+        records.append((cutoff, stats.roll_out_length, stats.simulations_per_second, wins, losses, ties,
+                        (wins + ties/2)/num_games))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='play MCTS with cut-off roll-outs against MCTS with full roll-outs')
+    parser.add_argument('--cutoffs', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--time-limit', type=float, default=0.3)
+    args = parser.parse_args()
+    records = benchmark(args.cutoffs, args.games, args.time_limit)
+    print(tabulate(records, headers=['cutoff', 'roll-out length', 'simulations/s', 'wins', 'losses', 'ties', 'score'],
+                   floatfmt='.2f'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+from env.macros import *
+from utils.test_utils import generate_random_game
+
+# (number of random moves, seed) pairs reaching unfinished late-game positions
+ENDGAMES = [(45, 1), (45, 4), (50, 0), (50, 2), (50, 3), (50, 4),
+            (55, 0), (55, 2), (55, 4), (60, 2)]
+
+
+def load_endgames():
+    '''
+    return the fixed set of endgame states as a list of (name, state)
+    '''
+    endgames = []
+    for num_steps, seed in ENDGAMES:
+        state = generate_random_game(num_steps, seed)
+        assert state['outcome'] == INCOMPLETE, f'endgame {num_steps}-{seed} is already finished'
+        endgames.append((f'{num_steps}-{seed}', state))
+    return endgames
@@ -0,0 +1,125 @@
+import argparse
+import random
+from time import time
+
+import numpy as np
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from mcts.array_tree import NO_CHILD, ArrayTree
+from mcts.core import MCTS
+from players.random_player import RandomPlayer
+from tabulate import tabulate
+from utils.test_utils import generate_random_game
+
+# (number of random moves, seed) of the opening, middle game and late game positions
+POSITIONS = [(0, 0), (20, 0), (40, 0)]
+
+
+def _simulations(tree):
+    '''
+    return a function running a number of simulations on a tree one at a time
+    '''
+    def run(num: int):
+        for _ in range(num):
+            tree.simulate()
+    return run
+
+
+# every backend builds a function running a number of simulations from a state,
+# and the number of roll-outs played per simulation
+BACKENDS = {
+    'arrays': (lambda state: _simulations(ArrayTree(state, RandomPlayer(), 1.4)), 1),
+    'batch-leaf': (lambda state: MCTS(state, RandomPlayer(), 1.4, batch_size=16).run_simulation, 16),
+    'batch-leaves': (lambda state: MCTS(state, RandomPlayer(), 1.4, batch_size=16, batch_leaves=True).run_simulation, 1),
+}
+
+
+def load_positions():
+    '''
+    return the benchmark states as a list of (name, state)
+    '''
+    positions = []
+    for num_steps, seed in POSITIONS:
+        state = generate_random_game(num_steps, seed) if num_steps else UltimateTTT(None, None).get_state()
+        assert state['outcome'] == INCOMPLETE, f'position {num_steps}-{seed} is already finished'
+        positions.append((f'{num_steps}-{seed}', state))
+    return positions
+
+
+def benchmark(backends: list, num_simulation: int = 1000, seed: int = 0):
+    '''
+    run the simulations from every position with every tree backend
+    return a list of (position, backend, seconds, simulations per second, roll-outs per second)
+    '''
+    records = []
+    for name, state in load_positions():
+        for backend in backends:
+            random.seed(seed)
+            np.random.seed(seed)
+            create, roll_outs = BACKENDS[backend]
+            run = create(state)
+            start = time()
+            run(num_simulation)
+            elapsed = time() - start
+            records.append((name, backend, elapsed, num_simulation/elapsed, num_simulation*roll_outs/elapsed))
+    return records
+
+
+def _node_hashes(tree: ArrayTree):
+    '''
+    return the position hash of every node of the tree reached from the root, replaying the moves
+    '''
+    hashes = {}
+    stack = [(tree.root, tree.game.copy())]
+    while stack:
+        node, game = stack.pop()
+        hashes[node] = game.get_hash()
+        children = tree.children(node)
+        for edge in range(children.start, children.stop):
+            if tree.child[edge] != NO_CHILD and tree.child[edge] not in hashes:
+                child_game = game.copy()
+                child_game.update_state(int(tree.move[edge]))
+                stack.append((tree.child[edge], child_game))
+    return hashes
+
+
+def transposition_report(num_simulation: int = 2000, seed: int = 0):
+    '''
+    grow a tree without sharing transpositions from every position and count the positions it stores twice
+    return a list of (position, nodes, distinct positions, duplicate ratio, bytes, bytes saved by sharing),
+    sharing saves a duplicated node and its edges
+    '''
+    records = []
+    for name, state in load_positions():
+        random.seed(seed)
+        tree = ArrayTree(state, RandomPlayer(), 1.4)
+        _simulations(tree)(num_simulation)
+        node_bytes, edge_bytes = tree.item_bytes()
+        seen, saved = set(), 0
+        for node, key in _node_hashes(tree).items():
+            if key in seen:
+                children = tree.children(node)
+                saved += node_bytes + (children.stop - children.start)*edge_bytes
+            seen.add(key)
+        records.append((name, len(tree), len(seen), 1 - len(seen)/len(tree), tree.memory(), saved))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='measure the simulations per second of MCTS')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--simulations', type=int, default=1000)
+    parser.add_argument('--transpositions', action='store_true',
+                        help='report the nodes and the memory shared by transpositions instead')
+    args = parser.parse_args()
+    if args.transpositions:
+        records = transposition_report(args.simulations)
+        print(tabulate(records, headers=['position', 'nodes', 'positions', 'duplicate ratio',
+                                         'bytes', 'bytes saved'], floatfmt='.3f'))
+        return
+    records = benchmark(args.backends, args.simulations)
+    print(tabulate(records, headers=['position', 'backend', 'seconds', 'simulations/s', 'roll-outs/s'], floatfmt='.1f'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+from solvers.neural_pns import NeuralInitializer
+from solvers.pns_init import UniformInitializer
+from tabulate import tabulate
+
+from benchmarks.pns_init import benchmark
+
+alphazero_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'alphazero')
+
+
+def main(train_steps: int):
+    initializers = {'uniform': UniformInitializer(),
+                    'neural': NeuralInitializer.from_checkpoint(train_steps, alphazero_path)}
+    records = benchmark(initializers)
+    print(tabulate(records, headers=['initializer', 'endgame', 'result',
+                                     'iterations', 'seconds'], floatfmt='.3f'))
+
+
+if __name__ == '__main__':
+    # the training step of the checkpoint under alphazero/checkpoints
+    main(int(sys.argv[1]))
@@ -0,0 +1,41 @@
+from time import time
+
+from solvers.parallel_pns import ParallelPNS
+from solvers.pns import PNS
+from tabulate import tabulate
+
+from benchmarks.endgames import load_endgames
+
+
+def benchmark(worker_counts=(1, 2, 4, 8), bounded: bool = True):
+    '''
+    solve the endgame suite sequentially and with every number of workers
+    return a list of (workers, total seconds, speedup over the sequential solver)
+    '''
+    endgames = load_endgames()
+
+    start = time()
+    expected = []
+    for _, state in endgames:
+        result, _ = PNS(state, bounded).run()
+        expected.append(result)
+    sequential = time() - start
+
+    records = [('sequential', sequential, 1.0)]
+    for workers in worker_counts:
+        start = time()
+        for (name, state), result in zip(endgames, expected):
+            parallel_result, _ = ParallelPNS(state, bounded, workers).run()
+            assert parallel_result == result, f'endgame {name} solved inconsistently with {workers} workers'
+        elapsed = time() - start
+        records.append((workers, elapsed, sequential/elapsed))
+    return records
+
+
+def main():
+    records = benchmark()
+    print(tabulate(records, headers=['workers', 'seconds', 'speedup'], floatfmt='.3f'))
+
+
+if __name__ == '__main__':
+    main()
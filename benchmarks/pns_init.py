@@ -0,0 +1,48 @@
+from time import time
+
+from solvers.pns import PNS
+from solvers.pns_init import (MobilityInitializer, ThreatInitializer,
+                              UniformInitializer)
+from tabulate import tabulate
+
+from benchmarks.endgames import load_endgames
+
+
+def benchmark(initializers: dict, bounded: bool = True):
+    '''
+    initializers: dict -- maps a name to the initializer to benchmark
+    bounded: bool -- solve for at least a draw instead of a win
+    solve every endgame with every initializer
+    return a list of (initializer name, endgame name, result, iterations, seconds)
+    '''
+    records = []
+    for endgame, state in load_endgames():
+        for name, initializer in initializers.items():
+            solver = PNS(state, bounded, initializer)
+            start = time()
+            result, _ = solver.run()
+            records.append((name, endgame, result,
+                           solver.iterations, time() - start))
+    return records
+
+
+def main():
+    initializers = {'uniform': UniformInitializer(),
+                    'mobility': MobilityInitializer(),
+                    'threat': ThreatInitializer()}
+    records = benchmark(initializers)
+    print(tabulate(records, headers=['initializer', 'endgame', 'result',
+                                     'iterations', 'seconds'], floatfmt='.3f'))
+
+    print()
+    summary = []
+    for name in initializers:
+        iterations = sum(rec[3] for rec in records if rec[0] == name)
+        seconds = sum(rec[4] for rec in records if rec[0] == name)
+        summary.append((name, iterations, seconds))
+    print(tabulate(summary, headers=['initializer', 'total iterations',
+                                     'total seconds'], floatfmt='.3f'))
+
+
+if __name__ == '__main__':
+    main()
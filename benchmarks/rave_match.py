@@ -0,0 +1,65 @@
+import argparse
+import random
+
+import numpy as np
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from players.mcts_player import MCTSPlayer
+from tabulate import tabulate
+from utils.test_utils import generate_random_game
+
+# the number of random moves of the openings, so that the games differ
+OPENING_PLIES = 4
+
+
+def play_match(player, opponent, num_games: int, seed: int = 0):
+    '''
+    play num_games games from random openings, every opening twice with the colors swapped
+    return the number of (wins, losses, ties) of the player
+    '''
+    random.seed(seed)
+    np.random.seed(seed)
+    wins = losses = ties = 0
+    for index in range(num_games):
+        state = generate_random_game(OPENING_PLIES, seed + index//2)
+        player_x, player_o = (player, opponent) if index % 2 == 0 else (opponent, player)
+        game = UltimateTTT(player_x, player_o, state)
+        game.play()
+        if game.outcome == TIE:
+            ties += 1
+        elif (game.outcome == X_WIN) == (player_x is player):
+            wins += 1
+        else:
+            losses += 1
+        player.reset()
+        opponent.reset()
+    return wins, losses, ties
+
+
+def benchmark(rave: float = 300, num_games: int = 20, num_simulation: int = 200, time_limit: float = 0.3):
+    '''
+    play MCTS with RAVE against plain MCTS at equal simulations and at equal time per move
+    return a list of (budget, wins, losses, ties, score) of RAVE
+    '''
+    budgets = [(f'{num_simulation} simulations', dict(num_simulation=num_simulation)),
+               (f'{time_limit}s', dict(num_simulation=None, time_limit=time_limit))]
+    records = []
+    for name, budget in budgets:
+        wins, losses, ties = play_match(MCTSPlayer(rave=rave, **budget), MCTSPlayer(**budget), num_games)
+        records.append((name, wins, losses, ties, (wins + ties/2)/num_games))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='play MCTS with RAVE against plain MCTS')
+    parser.add_argument('--rave', type=float, default=300)
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--simulations', type=int, default=200)
+    parser.add_argument('--time-limit', type=float, default=0.3)
+    args = parser.parse_args()
+    records = benchmark(args.rave, args.games, args.simulations, args.time_limit)
+    print(tabulate(records, headers=['budget per move', 'wins', 'losses', 'ties', 'score'], floatfmt='.2f'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from solvers.alpha_beta import AlphaBeta
+from solvers.boolean_minimax import BooleanMinimax
+from solvers.negamax import NegaMax
+from solvers.pns import PNS
+from utils.test_utils import generate_random_game
+
+POSITIONS_PATH = os.path.join(os.path.dirname(__file__), 'positions.json')
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# bump when the positions change so that results of different sets are never compared
+POSITIONS_VERSION = 1
+
+# the boolean solvers answer whether the player to move wins
+SOLVERS = {
+    'negamax': lambda state: NegaMax(state),
+    'alpha_beta': lambda state: AlphaBeta(state),
+    'boolean_minimax': lambda state: BooleanMinimax(state, bounded=False),
+    'pns': lambda state: PNS(state, bounded=False),
+}
+
+
+def generate_positions(plies=(45, 50, 55, 60, 65), per_ply: int = 3):
+    '''
+    return the first per_ply unfinished positions reached by seeded random games at every ply
+    '''
+    positions = []
+    for ply in plies:
+        seed, found = 0, 0
+        while found < per_ply:
+            state = generate_random_game(ply, seed)
+            if state['outcome'] == INCOMPLETE and len(state['history']) == ply:
+                positions.append({'name': f'{ply}-{seed}', 'ply': ply, 'seed': seed,
+                                  'moves': [move for _, move in state['history']]})
+                found += 1
+            seed += 1
+    return positions
+
+
+def write_positions(positions: list, path: str = POSITIONS_PATH):
+    '''
+    write the positions with one position per line so that changes read well in a diff
+    '''
+    with open(path, 'w') as f:
+        f.write(f'{{"version": {POSITIONS_VERSION}, "positions": [\n')
+        f.write(',\n'.join(json.dumps(position) for position in positions))
+        f.write('\n]}\n')
+
+
+def load_positions(path: str = POSITIONS_PATH):
+    '''
+    return the version of the position file and its positions as a list of (name, state)
+    the positions are replayed from their moves, so they do not depend on the random generator
+    '''
+    with open(path) as f:
+        data = json.load(f)
+    positions = []
+    for position in data['positions']:
+        game = UltimateTTT(None, None)
+        for move in position['moves']:
+            game.update_state(move)
+        assert game.outcome == INCOMPLETE, f'position {position["name"]} is already finished'
+        positions.append((position['name'], game.get_state()))
+    return data['version'], positions
+
+
+def _run(solver_name: str, state: dict, time_limit: float):
+    '''
+    solve the state in a fresh process so that the peak memory is the solver's own
+    '''
+    start = time()
+    result, move, stats = SOLVERS[solver_name](state).solve(time_limit=time_limit)
+    return {'result': result, 'move': move, 'proven': stats.proven, 'seconds': time() - start,
+            'nodes': stats.nodes, 'peak_memory': stats.peak_memory}
+
+
+def run_suite(positions: list, solvers: list, time_limit: float, verbose: bool = False):
+    '''
+    solve every position with every solver under the time limit
+    return a list of records
+    '''
+    records = []
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+        for solver_name in solvers:
+            for name, state in positions:
+                record = {'solver': solver_name, 'position': name}
+                record.update(executor.submit(_run, solver_name, state, time_limit).result())
+                records.append(record)
+                if verbose:
+                    print(f'{solver_name:16} {name:6} {str(record["result"]):5} '
+                          f'{"proven" if record["proven"] else "timeout":7} {record["seconds"]:8.3f}s '
+                          f'{record["nodes"]:10} nodes {record["peak_memory"]/2**20:6.0f} MiB', flush=True)
+    return records
+
+
+def write_report(report: dict, path: str):
+    '''
+    write the report with one record per line
+    '''
+    with open(path, 'w') as f:
+        f.write(f'{{"positions_version": {report["positions_version"]}, "time_limit": {report["time_limit"]}, '
+                '"records": [\n')
+        f.write(',\n'.join(json.dumps(record) for record in report['records']))
+        f.write('\n]}\n')
+
+
+def compare(report: dict, baseline: dict, threshold: float = 0.2, time_threshold: float = 0.5,
+            min_seconds: float = 0.1):
+    '''
+    threshold: float -- the relative increase of nodes counted as a regression
+    time_threshold: float -- the relative increase of time counted as a regression, looser since
+                             the node counts are reproducible and the times are not
+    min_seconds: float -- differences in time below this are noise
+    return the regressions of the report against the baseline as a list of messages
+    '''
+    assert report['positions_version'] == baseline['positions_version'], \
+        'the report and the baseline were made on different positions'
+    base_records = {(rec['solver'], rec['position']): rec for rec in baseline['records']}
+    regressions = []
+    for rec in report['records']:
+        base = base_records.get((rec['solver'], rec['position']))
+        if base is None or not base['proven']:
+            continue
+        label = f'{rec["solver"]} on {rec["position"]}'
+        if not rec['proven']:
+            regressions.append(f'{label}: no longer solved within the time limit')
+            continue
+        if rec['result'] != base['result']:
+            regressions.append(f'{label}: result {rec["result"]} instead of {base["result"]}')
+        if rec['seconds'] > base['seconds']*(1 + time_threshold) and rec['seconds'] - base['seconds'] > min_seconds:
+            regressions.append(f'{label}: {rec["seconds"]:.3f}s instead of {base["seconds"]:.3f}s')
+        if rec['nodes'] > base['nodes']*(1 + threshold):
+            regressions.append(f'{label}: {rec["nodes"]} nodes instead of {base["nodes"]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark the solvers on fixed endgame positions')
+    parser.add_argument('--solvers', nargs='+', default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument('--time-limit', type=float, default=10.0)
+    parser.add_argument('--positions', default=POSITIONS_PATH)
+    parser.add_argument('--output', help='write the report to this json file')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='compare the report against this json file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative increase of nodes')
+    parser.add_argument('--time-threshold', type=float, default=0.5, help='relative increase of time')
+    parser.add_argument('--save-baseline', action='store_true', help='write the report as the new baseline')
+    parser.add_argument('--generate-positions', action='store_true',
+                        help='write a new position file and exit')
+    args = parser.parse_args()
+
+    if args.generate_positions:
+        write_positions(generate_positions(), args.positions)
+        return
+
+    version, positions = load_positions(args.positions)
+    records = run_suite(positions, args.solvers, args.time_limit, verbose=True)
+    report = {'positions_version': version, 'time_limit': args.time_limit, 'records': records}
+    if args.output:
+        write_report(report, args.output)
+    if args.save_baseline:
+        write_report(report, args.baseline)
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold, args.time_threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print('no regression against the baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import numpy as np
+from env.macros import *
+from env.ultimate_ttt import Step
+from utils.env_utils import LINES, POSITION, SLOTS, SUB_BOARD
+
+FREE = 9
+# the number of last moves kept for every game, the history of the eight positions of the alphazero features
+RECENT = 7
+
+
+def _winner(boards: np.ndarray, player: np.ndarray):
+    '''
+    boards: np.ndarray -- 3x3 boards flattened to shape (n, 9)
+    player: np.ndarray -- the marker of the player who moved last on every board
+    return whether the player owns a whole line of the board
+    '''
+    return np.any(np.all(boards[:, LINES] == player[:, None, None], axis=2), axis=1)
+
+
+def _recent_moves(game):
+    '''
+    return the last RECENT moves of the game padded with -1 in front, from its previous move without a history
+    '''
+    moves = [move for _, move in game.history[-RECENT:]]
+    if not moves and game.previous_move is not None:
+        moves = [game.previous_move]
+    return [-1]*(RECENT - len(moves)) + moves
+
+
+class BatchedGames:
+    '''
+    a batch of games stacked into arrays so that every step plays a move in all of them at once
+    inner: (n, 81) markers of the slots by ordinal, outer: (n, 9) outcomes of the sub-boards,
+    target: the sub-board the player to move is sent to, FREE when they can play anywhere,
+    recent: (n, RECENT) the last moves of every game, the latest last and -1 before the first move
+    games: the UltimateTTT games to start from, they are not modified
+    '''
+
+    def __init__(self, games: list) -> None:
+        self.inner = np.array([game.inner_board.reshape(81) for game in games], dtype=np.int8)
+        self.outer = np.array([game.outer_board.reshape(9) for game in games], dtype=np.int8)
+        self.current_player = np.array([game.current_player for game in games], dtype=np.int8)
+        self.outcome = np.array([game.outcome for game in games], dtype=np.int8)
+        self.target = np.array([FREE if game.previous_move is None or game.outer_board.flat[POSITION[game.previous_move]]
+                                != INCOMPLETE else POSITION[game.previous_move] for game in games])
+        self.recent = np.array([_recent_moves(game) for game in games]).reshape(len(games), RECENT)
+        self.plies = np.zeros(len(games), dtype=np.int64)
+
+    def valid_moves(self, active: np.ndarray):
+        '''
+        return the mask of the valid moves of the active games, shape (number of active games, 81)
+        '''
+        inner, outer, target = self.inner[active], self.outer[active], self.target[active]
+        open_slot = (inner == EMPTY) & (outer[:, SUB_BOARD] == INCOMPLETE)
+        in_target = (target[:, None] == FREE) | (SUB_BOARD[None, :] == target[:, None])
+        return open_slot & in_target
+
+    def step(self, active: np.ndarray, moves: np.ndarray):
+        '''
+        play the moves in the active games, given as an array of indices
+        '''
+        player = self.current_player[active]
+        self.inner[active, moves] = player
+        self.plies[active] += 1
+
+        subs = SUB_BOARD[moves]
+        sub_boards = self.inner[active[:, None], SLOTS[subs]]
+        won = _winner(sub_boards, player)
+        full = np.all(sub_boards != EMPTY, axis=1)
+        self.outer[active, subs] = np.where(won, player, np.where(full, TIE, INCOMPLETE))
+
+        # X_WIN and O_WIN are the markers of X and O, so the outer board is checked like a sub-board
+        game_won = _winner(self.outer[active], player)
+        game_full = np.all(self.outer[active] != INCOMPLETE, axis=1)
+        self.outcome[active] = np.where(game_won, player, np.where(game_full, TIE, INCOMPLETE))
+
+        targets = POSITION[moves]
+        self.target[active] = np.where(self.outer[active, targets] == INCOMPLETE, targets, FREE)
+        self.current_player[active] = -player
+        self.recent[active, :-1] = self.recent[active, 1:]
+        self.recent[active, -1] = moves
+
+    def random_play_out(self, max_plies: int = None):
+        '''
+        play uniformly random moves in every game until they are all over, or for max_plies plies when given
+        return the outcomes of the games, INCOMPLETE for the ones cut off
+        '''
+        active = np.flatnonzero(self.outcome == INCOMPLETE)
+        plies = 0
+        while len(active) > 0 and plies != max_plies:
+            plies += 1
+            valid = self.valid_moves(active)
+            # the largest of uniform keys over the valid moves is a uniformly random valid move
+            moves = np.argmax(np.random.random(valid.shape)*valid, axis=1)
+            self.step(active, moves)
+            active = active[self.outcome[active] == INCOMPLETE]
+        return self.outcome.copy()
+
+    @property
+    def previous_move(self):
+        return self.recent[:, -1]
+
+    def get_states(self, indices: np.ndarray):
+        '''
+        return the state dicts of the games at the indices, their history only holds the last RECENT moves
+        '''
+        states = []
+        for index in indices:
+            moves = [int(move) for move in self.recent[index] if move >= 0]
+            states.append({'inner_board': self.inner[index].reshape(9, 9).astype(np.short),
+                           'current_player': int(self.current_player[index]),
+                           'outcome': int(self.outcome[index]),
+                           'previous_move': moves[-1] if moves else None,
+                           'history': [Step(previous, move) for previous, move in zip([None] + moves[:-1], moves)]})
+        return states
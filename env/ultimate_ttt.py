@@ -2,6 +2,7 @@ import numpy as np
 from termcolor import colored
 from env.macros import *
 from utils.env_utils import *
+from utils.hash_utils import board_hash, cell_key, position_hash
 from players.random_player import RandomPlayer
 from players.human_player import HumanPlayer
 from collections import namedtuple
@@ -20,6 +21,7 @@ class UltimateTTT:
             self.next_valid_moves = get_valid_moves(
                 self.inner_board, self.outer_board, self.previous_move)
             self.history = state['history'].copy()
+            self.board_key = board_hash(self.inner_board)
         else:
             self.inner_board = np.zeros((9, 9), dtype=np.short)
             self.outer_board = np.zeros((3, 3), dtype=np.short)
@@ -28,6 +30,7 @@ class UltimateTTT:
             self.previous_move = None
             self.next_valid_moves = tuple(range(0, 81))
             self.history = []
+            self.board_key = 0
 
         self.player_x = player_x
         self.player_o = player_o
@@ -101,6 +104,24 @@ class UltimateTTT:
         }
         return state
 
+    def copy(self):
+        '''
+        return an independent copy of the game without going through a state dict
+        '''
+        game = UltimateTTT.__new__(UltimateTTT)
+        game.__dict__.update(self.__dict__)
+        game.inner_board = np.copy(self.inner_board)
+        game.outer_board = np.copy(self.outer_board)
+        game.history = self.history.copy()
+        return game
+
+    def get_hash(self):
+        '''
+        return the position hash of the current game state
+        '''
+        return position_hash(self.board_key, self.outer_board,
+                             self.current_player, self.previous_move)
+
     def make_move(self):
         '''
         return the move in ordinal form selected by the current player
@@ -153,6 +174,7 @@ class UltimateTTT:
         # update inner board
         inner_coord = ordinal_to_coordinate(move)
         self.inner_board[inner_coord] = self.current_player
+        self.board_key ^= cell_key(move, self.current_player)
         # update the outer board
         outer_row, outer_col = ordinal_to_coordinate(
             move, target_board='outer')
@@ -167,6 +189,8 @@ class UltimateTTT:
         after undoing the move
         '''
         inner_coord = ordinal_to_coordinate(move)
+        # the marker being taken back belongs to the previous player
+        self.board_key ^= cell_key(move, self.inner_board[inner_coord])
         self.inner_board[inner_coord] = EMPTY  # undo inner board position
         outer_row, outer_col = ordinal_to_coordinate(
             move, target_board='outer')
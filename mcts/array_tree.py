@@ -0,0 +1,587 @@
+import random
+
+import numpy as np
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from players.random_player import RandomPlayer
+from utils.eval_utils import static_values
+from utils.hash_utils import hash_state
+
+NO_CHILD = -1
+
+# proven results of a node for the player who made its move
+WIN = 1
+DRAW = 0
+LOSS = -1
+UNPROVEN = 2
+
+
+def play_out(game: UltimateTTT, roll_out_player, max_plies: int = None):
+    '''
+    let the roll-out player play both sides until the end of the game, or for max_plies plies when given
+    return the outcome of the game, INCOMPLETE when it is cut off
+    '''
+    if type(roll_out_player) is RandomPlayer:
+        # a random roll-out picks among the valid moves of the game without asking the player
+        plies = 0
+        while game.outcome == INCOMPLETE and plies != max_plies:
+            game.update_state(random.choice(game.next_valid_moves))
+            plies += 1
+    elif max_plies is None:
+        game.player_x = game.player_o = roll_out_player
+        game.play()
+    else:
+        game.player_x = game.player_o = roll_out_player
+        for _ in range(max_plies):
+            if game.outcome != INCOMPLETE:
+                break
+            game.update_state(game.make_move())
+    return game.outcome
+
+
+def evaluate(game: UltimateTTT, evaluator=None):
+    '''
+    return the value of the unfinished game for X in [-1, 1], from the evaluator,
+    a function of a state returning its value for the player to move, else from static_values
+    '''
+    if evaluator is None:
+        return float(static_values(game.inner_board.reshape(1, 81), game.outer_board.reshape(1, 9))[0])
+    return float(evaluator(game.get_state()))*game.current_player
+
+
+def outcome_value(outcome: int):
+    '''
+    return the value of the outcome for X
+    '''
+    return 0. if outcome == TIE else float(outcome)
+
+
+def favoured_outcome(x_value: float):
+    '''
+    return the outcome a value for X points to, which stands for a cut-off roll-out in the outcome counts
+    '''
+    return X_WIN if x_value > 0 else (O_WIN if x_value < 0 else TIE)
+
+
+class ArrayTree:
+    '''
+    the search tree of MCTS kept in preallocated arrays, nodes and edges are indices into them
+    an edge holds its move, the node it reaches and the statistics of the move at its parent:
+    the visit count and the sum of the outcomes for the player who made it
+    a node holds the same statistics over every simulation through it and its edges, which are
+    allocated together when it is first selected from, so they are the slots
+    [first_child, first_child + num_children) of the edge arrays
+    the nodes do not keep states, every simulation replays the moves from a copy of the root game
+    the tree is also an MCTS-Solver: proof holds the proven result of a node for the player who made
+    its move, finished games and exact tablebase results are proven when they are reached and the
+    proofs are backed up minimax-style, proven nodes end the simulations that reach them and
+    proven losing moves are no longer selected
+    tablebase: an optional store of solved positions whose exact results replace the roll-outs
+    transpositions: share one node between all the edges reaching the same position, found through
+                    a table keyed by the position hash, which turns the tree into a DAG; selection
+                    uses the visit counts of the edges and the values of the shared nodes
+    rave: the equivalence parameter of RAVE, 0 for plain UCT; the edges also keep all-moves-as-first
+          (AMAF) statistics, a visit for every simulation in which the player to move at the parent
+          played the move at any later point, and selection blends the AMAF value into the value of
+          an edge with the weight sqrt(rave/(3*visits + rave)), so the two weigh the same at rave visits
+    cutoff: stop the roll-outs after this many plies and score the positions with the evaluator, None to play
+            them to the end; a cut-off roll-out backs up its value and counts for the outcome it favours
+    evaluator: a function of a state returning its value in [-1, 1] for the player to move, the static
+               evaluation of utils.eval_utils from the won sub-boards and the threats when None
+    max_nodes: the budget of nodes, None for no budget; the node arrays are then a pool of max_nodes slots,
+               the nodes of the branches left behind by advance go back to the pool, and when the pool is
+               full the least visited leaves are pruned down to PRUNE_RATIO of it before the next simulation
+    capacity: the initial number of nodes and of edges, doubled whenever the arrays are full
+    '''
+    NODE_ARRAYS = ('parent', 'first_child', 'num_children', 'node_visits', 'node_value_sum', 'proof')
+    EDGE_ARRAYS = ('move', 'child', 'visits', 'value_sum')
+    RAVE_ARRAYS = ('amaf_visits', 'amaf_value_sum')
+    FILL = {'parent': NO_CHILD, 'first_child': NO_CHILD, 'child': NO_CHILD, 'proof': UNPROVEN}
+    PRUNE_RATIO = 0.75
+
+    def __init__(self, state: dict, roll_out_player, explore_factor, tablebase=None, transpositions: bool = False,
+                 rave: float = 0, max_nodes: int = None, cutoff: int = None, evaluator=None,
+                 capacity: int = 2**14) -> None:
+        assert max_nodes is None or max_nodes > 1, 'the node budget has to hold the root and a child'
+        self.player = roll_out_player
+        self.C = explore_factor
+        self.tablebase = tablebase
+        self.transpositions = transpositions
+        self.rave = rave
+        self.max_nodes = max_nodes
+        self.cutoff = cutoff
+        self.evaluator = evaluator
+
+        node_capacity = capacity if max_nodes is None else max_nodes
+        self.parent = np.full(node_capacity, NO_CHILD, dtype=np.int32)
+        self.first_child = np.full(node_capacity, NO_CHILD, dtype=np.int32)
+        self.num_children = np.zeros(node_capacity, dtype=np.int8)
+        self.node_visits = np.zeros(node_capacity, dtype=np.int64)
+        self.node_value_sum = np.zeros(node_capacity, dtype=np.float64)
+        self.proof = np.full(node_capacity, UNPROVEN, dtype=np.int8)
+
+        self.move = np.zeros(capacity, dtype=np.int8)
+        self.child = np.full(capacity, NO_CHILD, dtype=np.int32)
+        self.visits = np.zeros(capacity, dtype=np.int64)
+        self.value_sum = np.zeros(capacity, dtype=np.float64)
+        if rave:
+            self.EDGE_ARRAYS = self.EDGE_ARRAYS + self.RAVE_ARRAYS
+            self.amaf_visits = np.zeros(capacity, dtype=np.int64)
+            self.amaf_value_sum = np.zeros(capacity, dtype=np.float64)
+        # the number of roll-outs played and their total length in plies, cleared by every search
+        self.roll_outs = 0
+        self.roll_out_plies = 0
+        self.reset(state)
+
+    def __len__(self):
+        return self.num_nodes
+
+    def reset(self, state: dict):
+        '''
+        start a new tree rooted at the state
+        '''
+        self.game = UltimateTTT(None, None, state)
+        self.num_nodes = 0
+        self.num_edges = 0
+        # the node of every position hash when sharing transpositions
+        self.table = {}
+        # the number of edges that reached a node already in the table
+        self.shared = 0
+        # the number of selected leaves waiting for their backup, the tree is only pruned when there are none
+        self.pending = 0
+        self.root = self._new_node(NO_CHILD, self.game)
+
+    def _grow(self, names: tuple, size: int):
+        capacity = len(getattr(self, names[0]))
+        while capacity < size:
+            capacity *= 2
+        for name in names:
+            old = getattr(self, name)
+            new = np.full(capacity, self.FILL.get(name, 0), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def item_bytes(self):
+        '''
+        return the number of bytes of (a node, an edge) in the arrays
+        '''
+        return (sum(getattr(self, name).itemsize for name in self.NODE_ARRAYS),
+                sum(getattr(self, name).itemsize for name in self.EDGE_ARRAYS))
+
+    def memory(self):
+        '''
+        return the number of bytes used by the nodes and the edges in the arrays
+        '''
+        node_bytes, edge_bytes = self.item_bytes()
+        return self.num_nodes*node_bytes + self.num_edges*edge_bytes
+
+    def _new_node(self, parent: int, game: UltimateTTT):
+        '''
+        return the node of the game, a new one unless the position is shared from the table
+        '''
+        if self.transpositions:
+            key = game.get_hash()
+            if key in self.table:
+                self.shared += 1
+                return self.table[key]
+        node = self.num_nodes
+        if node >= len(self.parent):
+            self._grow(self.NODE_ARRAYS, node + 1)
+        self.parent[node] = parent
+        self.first_child[node] = NO_CHILD
+        self.num_children[node] = 0
+        self.node_visits[node] = 0
+        self.node_value_sum[node] = 0
+        self.proof[node] = UNPROVEN
+        self.num_nodes += 1
+        if self.transpositions:
+            self.table[key] = node
+        return node
+
+    def expand(self, node: int, moves: tuple):
+        '''
+        allocate an edge of the node for each of the moves
+        '''
+        first, count = self.num_edges, len(moves)
+        if first + count > len(self.move):
+            self._grow(self.EDGE_ARRAYS, first + count)
+        children = slice(first, first + count)
+        self.move[children] = moves
+        self.child[children] = NO_CHILD
+        self.visits[children] = 0
+        self.value_sum[children] = 0
+        if self.rave:
+            self.amaf_visits[children] = 0
+            self.amaf_value_sum[children] = 0
+        self.first_child[node] = first
+        self.num_children[node] = count
+        self.num_edges += count
+
+    def children(self, node: int):
+        '''
+        return the slice of the edges of the node, empty when it is not expanded
+        '''
+        first = self.first_child[node]
+        if first == NO_CHILD:
+            return slice(0, 0)
+        return slice(first, first + self.num_children[node])
+
+    def _child_proofs(self, children: slice):
+        child = self.child[children]
+        return np.where(child != NO_CHILD, self.proof[child], UNPROVEN)
+
+    def _amaf_values(self, children: slice):
+        visits = self.amaf_visits[children]
+        return np.where(visits > 0, self.amaf_value_sum[children]/np.maximum(visits, 1), 0.)
+
+    def select(self, node: int):
+        '''
+        return the edge of the node with the highest UCT score among the moves not proven to lose,
+        edges that have never been visited come first, ordered by their AMAF value with RAVE,
+        and ties are broken at random
+        '''
+        children = self.children(node)
+        visits = self.visits[children]
+        candidates = self._child_proofs(children) != LOSS
+        if not candidates.any():
+            candidates[:] = True
+        unvisited = np.flatnonzero((visits == 0) & candidates)
+        if len(unvisited) > 0:
+            if self.rave:
+                amaf = self._amaf_values(children)[unvisited]
+                unvisited = unvisited[amaf == amaf.max()]
+            return children.start + unvisited[random.randrange(len(unvisited))]
+        total_visit = visits.sum()
+        values = self.value_sum[children]/visits
+        if self.transpositions:
+            # the value of a move is the value of the node it reaches, the edge's own when the node is pruned
+            child = self.child[children]
+            node_visits = self.node_visits[child]
+            shared = (child != NO_CHILD) & (node_visits > 0)
+            values = np.where(shared, self.node_value_sum[child]/np.maximum(node_visits, 1), values)
+        if self.rave:
+            beta = np.where(self.amaf_visits[children] > 0, np.sqrt(self.rave/(3*visits + self.rave)), 0.)
+            values = (1 - beta)*values + beta*self._amaf_values(children)
+        scores = values + self.C*np.sqrt(np.log(total_visit)/visits)
+        scores[~candidates] = -np.inf
+        best = np.flatnonzero(scores == scores.max())
+        return children.start + best[random.randrange(len(best))]
+
+    def known_outcome(self, game: UltimateTTT, path: list):
+        '''
+        game: UltimateTTT -- the game at the end of the path
+        path: list -- the path of edges returned by select_leaf
+        return the outcome of the game when its node is proven, the game is over or the tablebase
+        knows it, else None; the node is proven by a finished game or a tablebase result
+        '''
+        node = self.child[path[-1]] if path else self.root
+        # the player who made the move of the node
+        mover = -game.current_player
+        if self.proof[node] != UNPROVEN:
+            return TIE if self.proof[node] == DRAW else (mover if self.proof[node] == WIN else -mover)
+
+        outcome = game.outcome
+        if outcome == INCOMPLETE and self.tablebase is not None:
+            outcome = self.probe_tablebase(game)
+        if outcome is None or outcome == INCOMPLETE:
+            return None
+        # X_WIN and O_WIN are the markers of X and O
+        self.proof[node] = DRAW if outcome == TIE else (WIN if outcome == mover else LOSS)
+        return outcome
+
+    def roll_out(self, game: UltimateTTT, path: list):
+        '''
+        let the simulation players play the game until the end or the cutoff
+        return (outcome of the game, its value for X), the outcome a cut-off game favours
+        '''
+        outcome = self.known_outcome(game, path)
+        if outcome is not None:
+            return outcome, outcome_value(outcome)
+        plies = len(game.history)
+        outcome = play_out(game, self.player, self.cutoff)
+        self.roll_outs += 1
+        self.roll_out_plies += len(game.history) - plies
+        if outcome == INCOMPLETE:
+            x_value = evaluate(game, self.evaluator)
+            return favoured_outcome(x_value), x_value
+        return outcome, outcome_value(outcome)
+
+    def probe_tablebase(self, game: UltimateTTT):
+        '''
+        return the outcome of the game under perfect play if the tablebase knows it exactly, else None
+        '''
+        entry = self.tablebase.probe(game.get_hash())
+        if entry is None or not entry.is_exact():
+            return None
+        if entry.value == 0:
+            return TIE
+        winner = game.current_player if entry.value == 1 else -game.current_player
+        return X_WIN if winner == X else O_WIN
+
+    def select_leaf(self, virtual_loss: int = 0):
+        '''
+        virtual_loss: int -- the number of losses temporarily added to every move on the path,
+                             so that concurrent selections spread over the tree until backup
+        perform tree policy down to a new node, a proven node or a finished game
+        return (path of edges, players who made their moves, game at the end of the path)
+        '''
+        if self.over_budget() and self.pending == 0:
+            self.prune()
+        game = self.game.copy()
+        node = self.root
+        path, movers = [], []
+        while game.outcome == INCOMPLETE:
+            if self.first_child[node] == NO_CHILD:
+                self.expand(node, game.next_valid_moves)
+            edge = self.select(node)
+            path.append(edge)
+            movers.append(game.current_player)
+            game.update_state(int(self.move[edge]))
+            if self.child[edge] == NO_CHILD:
+                self.child[edge] = self._new_node(node, game)
+            node = self.child[edge]
+            # a shared node that has been visited through another edge is not a new leaf
+            if self.node_visits[node] == 0 or self.proof[node] != UNPROVEN:  # grow the tree by this node
+                break
+
+        if virtual_loss:
+            nodes = self.child[path]
+            self.visits[path] += virtual_loss
+            self.value_sum[path] -= virtual_loss
+            self.node_visits[nodes] += virtual_loss
+            self.node_value_sum[nodes] -= virtual_loss
+        self.pending += 1
+        return path, movers, game
+
+    def backup(self, path: list, movers: list, outcome: int, virtual_loss: int = 0):
+        '''
+        update the statistics of the moves on the path with the outcome and take back their virtual loss
+        '''
+        self.backup_value(path, movers, outcome_value(outcome), virtual_loss)
+
+    def backup_value(self, path: list, movers: list, x_value: float, virtual_loss: int = 0):
+        '''
+        x_value: float -- the value of the simulation for X in [-1, 1], e.g. the mean outcome of several roll-outs
+        update the statistics of the moves on the path with one visit of the value
+        and take back their virtual loss
+        '''
+        self.pending -= 1
+        nodes = self.child[path]
+        self.visits[path] += 1 - virtual_loss
+        self.node_visits[nodes] += 1 - virtual_loss
+        # the markers of X and O are 1 and -1, so the value for a mover is x_value*mover
+        values = virtual_loss + x_value*np.array(movers)
+        self.value_sum[path] += values
+        self.node_value_sum[nodes] += values
+        if path and self.proof[nodes[-1]] != UNPROVEN:
+            self._back_up_proof(nodes)
+
+    def backup_amaf(self, path: list, movers: list, game: UltimateTTT, x_value: float):
+        '''
+        game: UltimateTTT -- the game at the end of the simulation, its history holds the moves of the simulation
+        x_value: float -- the value of the simulation for X
+        add a visit of the value to the AMAF statistics of every edge of a node on the path
+        whose move was played later in the simulation by the player to move at the node
+        '''
+        moves = np.array([step.move for step in game.history[len(self.game.history):]], dtype=np.int64)
+        # the players alternate from the player to move at the root
+        players = np.where(np.arange(len(moves)) % 2 == 0, self.game.current_player, -self.game.current_player)
+        nodes = [self.root] + list(self.child[path[:-1]])
+        for depth, (node, mover) in enumerate(zip(nodes, movers)):
+            children = self.children(node)
+            played = moves[depth:][players[depth:] == mover]
+            edges = children.start + np.flatnonzero(np.isin(self.move[children], played))
+            self.amaf_visits[edges] += 1
+            self.amaf_value_sum[edges] += x_value*mover
+
+    def _solve(self, node: int):
+        '''
+        return the proof of the node from the proofs of its children
+        '''
+        proofs = self._child_proofs(self.children(node))
+        if len(proofs) == 0:
+            return UNPROVEN
+        if np.any(proofs == WIN):  # the player to move has a winning move
+            return LOSS
+        if np.any(proofs == UNPROVEN):
+            return UNPROVEN
+        return -proofs.max()
+
+    def _back_up_proof(self, nodes: np.ndarray):
+        '''
+        prove the ancestors of the proven last node of the path as far as its proof decides them
+        '''
+        for node in reversed([self.root] + list(nodes[:-1])):
+            if self.proof[node] != UNPROVEN:
+                break
+            proof = self._solve(node)
+            if proof == UNPROVEN:
+                break
+            self.proof[node] = proof
+
+    def over_budget(self):
+        return self.max_nodes is not None and self.num_nodes >= self.max_nodes
+
+    def _edges_of(self, nodes: np.ndarray):
+        '''
+        return (indices of the edges of the nodes block after block, number of edges of every node)
+        '''
+        first = self.first_child[nodes].astype(np.int64)
+        count = np.where(first == NO_CHILD, 0, self.num_children[nodes]).astype(np.int64)
+        offsets = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        return np.repeat(first, count) + offsets, count
+
+    def _compact(self, removed: np.ndarray = None):
+        '''
+        removed: np.ndarray -- nodes to drop with everything reached only through them
+        move the nodes reachable from the root and their edges to the front of the arrays in
+        breadth-first order, which gives the slots of the other nodes back; the root becomes node 0
+        '''
+        seen = np.zeros(self.num_nodes, dtype=bool)
+        if removed is not None:
+            seen[removed] = True
+        seen[self.root] = True
+        frontier = np.array([self.root])
+        levels = [frontier]
+        while len(frontier) > 0:
+            child = self.child[self._edges_of(frontier)[0]]
+            frontier = np.unique(child[child != NO_CHILD])
+            frontier = frontier[~seen[frontier]]
+            seen[frontier] = True
+            levels.append(frontier)
+        order = np.concatenate(levels)
+        new_id = np.full(self.num_nodes, NO_CHILD, dtype=np.int32)
+        new_id[order] = np.arange(len(order))
+
+        edges, count = self._edges_of(order)
+        for name in self.EDGE_ARRAYS:
+            array = getattr(self, name)
+            array[:len(edges)] = array[edges]
+        child = self.child[:len(edges)]
+        self.child[:len(edges)] = np.where(child != NO_CHILD, new_id[child], NO_CHILD)
+        for name in self.NODE_ARRAYS:
+            array = getattr(self, name)
+            array[:len(order)] = array[order]
+        self.first_child[:len(order)] = np.where(count > 0, np.cumsum(count) - count, NO_CHILD)
+        parent = self.parent[:len(order)]
+        self.parent[:len(order)] = np.where(parent != NO_CHILD, new_id[parent], NO_CHILD)
+
+        self.table = {key: int(new_id[node]) for key, node in self.table.items() if new_id[node] != NO_CHILD}
+        self.root = 0
+        self.num_nodes = len(order)
+        self.num_edges = len(edges)
+
+    def prune(self):
+        '''
+        remove the least visited leaves until the tree holds PRUNE_RATIO of max_nodes nodes, a leaf is
+        a node none of whose edges leads to a node; proven leaves are kept, and the edges keep the
+        statistics of the pruned nodes, which are created again if they get selected
+        '''
+        target = int(self.max_nodes*self.PRUNE_RATIO)
+        while self.num_nodes > target:
+            nodes = np.arange(self.num_nodes)
+            edges, count = self._edges_of(nodes)
+            has_child = np.zeros(self.num_nodes, dtype=bool)
+            has_child[np.repeat(nodes, count)[self.child[edges] != NO_CHILD]] = True
+            leaves = np.flatnonzero(~has_child & (self.proof[nodes] == UNPROVEN) & (nodes != self.root))
+            if len(leaves) == 0:
+                break
+            order = np.argsort(self.node_visits[leaves], kind='stable')
+            self._compact(leaves[order[:self.num_nodes - target]])
+
+    def is_solved(self):
+        return self.proof[self.root] != UNPROVEN
+
+    def root_outcome(self):
+        '''
+        return the outcome of the game from the root under perfect play, None if the root is not proven
+        '''
+        if not self.is_solved():
+            return None
+        proof = self.proof[self.root]
+        mover = -self.game.current_player
+        return TIE if proof == DRAW else (mover if proof == WIN else -mover)
+
+    def proven_move(self):
+        '''
+        return the best root move when the root is proven, None otherwise:
+        a winning move, else a drawing one, else the most visited one
+        '''
+        if not self.is_solved():
+            return None
+        children = self.children(self.root)
+        if children.stop == 0:
+            return None
+        proofs = self._child_proofs(children)
+        # a losing proof of the root means the player to move wins, so it has a winning move
+        best = np.flatnonzero(proofs == proofs[proofs != UNPROVEN].max()) if np.any(proofs != UNPROVEN) \
+            else np.arange(len(proofs))
+        index = best[np.argmax(self.visits[children][best])]
+        return int(self.move[children.start + index])
+
+    def losing_moves(self):
+        '''
+        return the root moves proven to lose
+        '''
+        children = self.children(self.root)
+        return self.move[children][self._child_proofs(children) == LOSS].astype(int)
+
+    def simulate(self):
+        '''
+        perform tree policy, roll out from the new node and back up
+        return the outcome of the simulated game
+        '''
+        path, movers, game = self.select_leaf()
+        outcome, x_value = self.roll_out(game, path)
+        self.backup_value(path, movers, x_value)
+        if self.rave:
+            self.backup_amaf(path, movers, game, x_value)
+        return outcome
+
+    def get_distribution(self):
+        '''
+        return (array of moves, array of visit counts) of the root
+        '''
+        children = self.children(self.root)
+        return self.move[children].astype(int), self.visits[children].copy()
+
+    def advance(self, move: int):
+        '''
+        move the root to the child reached by the move, creating it when the root is not expanded
+        '''
+        children = self.children(self.root)
+        if children.stop == 0:
+            self.expand(self.root, self.game.next_valid_moves)
+            children = self.children(self.root)
+        index = np.flatnonzero(self.move[children] == move)
+        assert len(index) == 1, f'move {move} is not valid at the root'
+        edge = children.start + index[0]
+        self.game.update_state(move)
+        if self.child[edge] == NO_CHILD:
+            self.child[edge] = self._new_node(self.root, self.game)
+        self.root = self.child[edge]
+        if self.max_nodes is not None:
+            self._compact()
+
+    def move_root(self, node: int, game: UltimateTTT):
+        '''
+        move the root to a node of the tree, given with its game; unlike advance the rest of the tree is kept,
+        so the root can move back up to an ancestor or over to another branch, as needed to search a whole book
+        '''
+        assert self.max_nodes is None, 'the nodes out of the subtree of the root may be pruned under a node budget'
+        self.root = node
+        self.game = game
+
+    def truncate(self, state: dict):
+        '''
+        move the root to the state when it is reached by a move from the root, else start a new tree;
+        the positions are compared by their hash
+        '''
+        prev_move = state['previous_move']
+        if prev_move is not None and prev_move in self.game.next_valid_moves:
+            game = self.game.copy()
+            game.update_state(prev_move)
+            if game.get_hash() == hash_state(state):
+                self.advance(prev_move)
+                return
+        self.reset(state)
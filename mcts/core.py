@@ -1,63 +1,469 @@
+import os
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from multiprocessing import Pipe
+from time import time
+
 import numpy as np
+from env.batched import BatchedGames
 from env.macros import *
+from players.random_player import RandomPlayer
+
+from mcts.array_tree import ArrayTree, evaluate, favoured_outcome, outcome_value, play_out
+from utils.eval_utils import static_values
+from utils.process_utils import worker_context
+
+
+@dataclass
+class SimulationStats:
+    '''
+    the work done by a search of MCTS
+    simulations: the number of simulations, a batch of roll-outs from one leaf counts as one
+    roll_outs: the number of roll-outs played, the simulations ending in a known outcome play none
+    roll_out_plies: the total number of plies played in the roll-outs
+    elapsed: the seconds spent in the search
+    '''
+    simulations: int = 0
+    roll_outs: int = 0
+    roll_out_plies: int = 0
+    elapsed: float = 0.0
+    start: float = field(default_factory=time, repr=False)
+
+    @property
+    def simulations_per_second(self):
+        return self.simulations/self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def roll_out_length(self):
+        return self.roll_out_plies/self.roll_outs if self.roll_outs else 0.0
+
+    def update_time(self):
+        self.elapsed = time() - self.start
+
+    def summary(self):
+        '''
+        return the statistics as a line of text
+        '''
+        return (f'{self.simulations} simulations in {self.elapsed:.2f}s ({self.simulations_per_second:.0f} simulations/s), '
+                f'{self.roll_outs} roll-outs of {self.roll_out_length:.1f} plies on average')
+
+
+def _count_outcomes(tree: ArrayTree, num: int):
+    '''
+    run num simulations on the tree, fewer when the root gets solved
+    return the number of (x wins, o wins, ties)
+    '''
+    x_win_total = 0
+    o_win_total = 0
+    tie_total = 0
+    for _ in range(num):
+        if tree.is_solved():
+            break
+        outcome = tree.simulate()
+        if outcome == X_WIN:
+            x_win_total += 1
+        elif outcome == O_WIN:
+            o_win_total += 1
+        else:
+            tie_total += 1
+    return x_win_total, o_win_total, tie_total
+
+
+def _root_statistics(tree: ArrayTree):
+    '''
+    return the visit counts and the value sums of the root moves as arrays indexed by move
+    '''
+    children = tree.children(tree.root)
+    moves = tree.move[children]
+    visits, values = np.zeros(81, dtype=np.int64), np.zeros(81)
+    visits[moves] = tree.visits[children]
+    values[moves] = tree.value_sum[children]
+    return visits, values
+
+
+def _play_out_worker(game, roll_out_player, cutoff: int = None, evaluator=None):
+    '''
+    return (outcome, value for X, number of plies played) of a roll-out in a worker process,
+    see ArrayTree for the cutoff and the evaluator
+    '''
+    plies = len(game.history)
+    outcome = play_out(game, roll_out_player, cutoff)
+    plies = len(game.history) - plies
+    if outcome == INCOMPLETE:
+        x_value = evaluate(game, evaluator)
+        return favoured_outcome(x_value), x_value, plies
+    return outcome, outcome_value(outcome), plies
+
+
+def _seed_roll_out_worker(seed: int):
+    # the forked workers would otherwise share the random state of the main process
+    random.seed(seed + os.getpid())
+    np.random.seed((seed + os.getpid()) % 2**32)
+
+
+def _worker(conn, state: dict, roll_out_player, explore_factor, tablebase, transpositions: bool, rave: float,
+            max_nodes: int, cutoff: int, evaluator, seed: int):
+    '''
+    keep an independent tree in a worker process and follow the commands of the main process:
+    ('run', num) answers the outcome counts, the root statistics and the (number, total plies) of
+    the roll-outs after num simulations,
+    ('advance', move) and ('truncate', state) move the root like in the main tree, ('close',) stops
+    '''
+    random.seed(seed)
+    np.random.seed(seed)
+    tree = ArrayTree(state, roll_out_player, explore_factor, tablebase, transpositions, rave, max_nodes,
+                     cutoff, evaluator)
+    while True:
+        command, *args = conn.recv()
+        if command == 'run':
+            tree.roll_outs = tree.roll_out_plies = 0
+            counts = _count_outcomes(tree, args[0])
+            conn.send((counts, _root_statistics(tree), (tree.roll_outs, tree.roll_out_plies)))
+        elif command == 'advance':
+            tree.advance(args[0])
+        elif command == 'truncate':
+            tree.truncate(args[0])
+        else:
+            break
+    conn.close()
 
-from mcts.tree_node import TreeNode
-from utils.env_utils import equal_state
 
 class MCTS:
+    '''
+    workers: the number of processes searching in parallel when larger than 1
+    parallel: how the workers search, accepted options: "root" and "tree"
+              root: independent trees, one in this process and the others in worker processes,
+                    each with its own random seed; the root statistics of the trees are added up
+                    before a move is selected
+              tree: a single tree in this process, the leaves are selected with virtual loss
+                    so that the pending ones spread over the tree, and rolled out by a pool of
+                    worker processes; only this process updates the tree, so it needs no locks
+    virtual_loss: the number of losses added to the moves leading to a leaf until its roll-out is backed up
+    batch_size: play this many random roll-outs at once with BatchedGames when larger than 1,
+                only for a RandomPlayer roll-out player
+    batch_leaves: False to play all the roll-outs of a batch from the new leaf and back up their mean,
+                  True to select as many different leaves with virtual loss and roll out each once
+    transpositions: share the nodes of the positions reached by different move orders, see ArrayTree
+    rave: the equivalence parameter of RAVE, 0 for plain UCT, see ArrayTree; the AMAF statistics need
+          the moves of the roll-outs, so it does not combine with tree parallelism or batched roll-outs
+    max_nodes: the budget of nodes of every tree, None for no budget, see ArrayTree; the tree may overrun it
+               by the leaves that are pending at once, which are at most batch_size or workers
+    cutoff, evaluator: stop the roll-outs after cutoff plies and score the positions with the evaluator,
+                       see ArrayTree; batched roll-outs are scored together, through evaluator.batch(states)
+                       when it has one; with workers the evaluator is pickled to the worker processes
+    '''
+    # the number of simulations per worker between two checks of the time limit
+    CHUNK = 8
+
     # initialze attributes
-    def __init__(self, state:dict, roll_out_player, explore_factor) -> None:
-        self.root = TreeNode(state, roll_out_player, explore_factor)
+    def __init__(self, state:dict, roll_out_player, explore_factor, tablebase=None, workers=1,
+                 parallel='root', virtual_loss=1, batch_size=1, batch_leaves=False, transpositions=False,
+                 rave=0, max_nodes=None, cutoff=None, evaluator=None) -> None:
+        assert workers > 0, 'the number of workers has to be positive'
+        assert parallel in ('root', 'tree'), f'parallel option {parallel} invalid, accepted arguments: "root", "tree"'
+        assert batch_size == 1 or type(roll_out_player) is RandomPlayer, 'only random roll-outs can be batched'
+        assert batch_size == 1 or workers == 1, 'batched roll-outs run in a single process'
+        assert rave == 0 or (batch_size == 1 and (workers == 1 or parallel == 'root')), \
+            'RAVE needs the roll-outs played by the tree'
+        self.tree = ArrayTree(state, roll_out_player, explore_factor, tablebase, transpositions, rave, max_nodes,
+                              cutoff, evaluator)
         self.player = roll_out_player
         self.C = explore_factor
+        self.tablebase = tablebase
+        self.workers = workers
+        self.parallel = parallel
+        self.virtual_loss = virtual_loss
+        self.batch_size = batch_size
+        self.batch_leaves = batch_leaves
+        self.transpositions = transpositions
+        self.rave = rave
+        self.max_nodes = max_nodes
+        self.cutoff = cutoff
+        self.evaluator = evaluator
+        # the roll-out processes of tree parallelism, started by the first simulations
+        self.executor = None
+        # the (connection, process) of every worker, started by the first simulations
+        self.connections = []
+        self.processes = []
+        # the root statistics added up over the trees of the workers
+        self.visits = None
+        self.values = None
+        self.stats = SimulationStats()
+        # the background thread running simulations between moves, see ponder
+        self.ponder_thread = None
+        self.stop_event = threading.Event()
+        self.pondered = 0
+
+    def _start_workers(self):
+        seed = random.randrange(2**31)
+        context = worker_context()
+        for index in range(1, self.workers):
+            conn, worker_conn = Pipe()
+            process = context.Process(target=_worker, args=(worker_conn, self.tree.game.get_state(), self.player,
+                                                            self.C, self.tablebase, self.transpositions, self.rave,
+                                                            self.max_nodes, self.cutoff, self.evaluator, seed + index),
+                                      daemon=True)
+            process.start()
+            self.connections.append(conn)
+            self.processes.append(process)
+
+    def _run_tree_parallel(self, num: int):
+        '''
+        run num simulations on the tree with the roll-outs in the worker processes
+        return the number of (x wins, o wins, ties)
+        '''
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context(),
+                                                initializer=_seed_roll_out_worker,
+                                                initargs=(random.randrange(2**31),))
+        totals = {X_WIN: 0, O_WIN: 0, TIE: 0}
+        pending = {}
+        started = 0
+        while started < num or pending:
+            # keep every worker busy with a leaf of its own, unless the tree has to be pruned once they are done
+            while started < num and len(pending) < self.workers and not self.tree.is_solved() \
+                    and not (pending and self.tree.over_budget()):
+                path, movers, game = self.tree.select_leaf(self.virtual_loss)
+                started += 1
+                outcome = self.tree.known_outcome(game, path)
+                if outcome is None:
+                    pending[self.executor.submit(_play_out_worker, game, self.player, self.cutoff,
+                                                 self.evaluator)] = (path, movers)
+                else:
+                    self.tree.backup(path, movers, outcome, self.virtual_loss)
+                    totals[outcome] += 1
+            if not pending:  # the root got solved
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, movers = pending.pop(future)
+                outcome, x_value, plies = future.result()
+                self.tree.roll_outs += 1
+                self.tree.roll_out_plies += plies
+                self.tree.backup_value(path, movers, x_value, self.virtual_loss)
+                totals[outcome] += 1
+        return totals[X_WIN], totals[O_WIN], totals[TIE]
 
-    def run_simulation(self, num: int):
-        x_win_total = 0
-        o_win_total = 0
-        tie_total = 0
-        for _ in range(num):
-            outcome = self.root.simulate()
-            if outcome == X_WIN:
-                x_win_total += 1
-            elif outcome == O_WIN:
-                o_win_total += 1
+    def _play_out_batch(self, games: list):
+        '''
+        play random roll-outs from the games at once, cut off and scored together with the cutoff
+        return (outcomes of the roll-outs, their values for X), the outcome a cut-off roll-out favours
+        '''
+        batch = BatchedGames(games)
+        outcomes = batch.random_play_out(self.cutoff)
+        self.tree.roll_outs += len(games)
+        self.tree.roll_out_plies += int(batch.plies.sum())
+        values = np.where(outcomes == TIE, 0, outcomes).astype(float)
+        cut = np.flatnonzero(outcomes == INCOMPLETE)
+        if len(cut) > 0:
+            if self.evaluator is None:
+                values[cut] = static_values(batch.inner[cut], batch.outer[cut])
             else:
-                tie_total += 1
-        
-        assert x_win_total + o_win_total + tie_total == num, f'sum of totals is inconsistent with the number of simulations'
+                states = batch.get_states(cut)
+                evaluate_batch = getattr(self.evaluator, 'batch', None)
+                player_values = evaluate_batch(states) if evaluate_batch is not None else \
+                    [self.evaluator(state) for state in states]
+                values[cut] = np.asarray(player_values, dtype=float)*batch.current_player[cut]
+            outcomes[cut] = [favoured_outcome(value) for value in values[cut]]
+        return outcomes, values
 
-        return (x_win_total/num, o_win_total/num, tie_total/num)
+    def _run_batched(self, num: int):
+        '''
+        run num simulations on the tree with batched random roll-outs
+        return ((x wins, o wins, ties) over all the roll-outs, number of simulations)
+        '''
+        totals = {X_WIN: 0, O_WIN: 0, TIE: 0}
+        simulations = 0
+        while simulations < num and not self.tree.is_solved():
+            if self.batch_leaves:
+                count = min(self.batch_size, num - simulations)
+                leaves = [self.tree.select_leaf(self.virtual_loss) for _ in range(count)]
+                outcomes = [self.tree.known_outcome(game, path) for path, _, game in leaves]
+                values = [None if outcome is None else outcome_value(outcome) for outcome in outcomes]
+                unknown = [index for index, outcome in enumerate(outcomes) if outcome is None]
+                if unknown:
+                    played, played_values = self._play_out_batch([leaves[index][2] for index in unknown])
+                    for index, outcome, value in zip(unknown, played, played_values):
+                        outcomes[index], values[index] = int(outcome), value
+                for (path, movers, _), outcome, value in zip(leaves, outcomes, values):
+                    self.tree.backup_value(path, movers, value, self.virtual_loss)
+                    totals[outcome] += 1
+                simulations += count
+            else:
+                path, movers, game = self.tree.select_leaf()
+                outcome = self.tree.known_outcome(game, path)
+                if outcome is not None:
+                    outcomes, values = [outcome], [outcome_value(outcome)]
+                else:
+                    outcomes, values = self._play_out_batch([game]*self.batch_size)
+                for outcome in outcomes:
+                    totals[int(outcome)] += 1
+                self.tree.backup_value(path, movers, float(np.mean(values)))
+                simulations += 1
+        return (totals[X_WIN], totals[O_WIN], totals[TIE]), simulations
 
+    def _run(self, num: int):
+        '''
+        run num simulations with the search options, fewer when the root gets solved
+        return ((x wins, o wins, ties) over all the roll-outs, number of simulations)
+        '''
+        if self.batch_size > 1:
+            return self._run_batched(num)
+        if self.workers == 1:
+            counts = _count_outcomes(self.tree, num)
+        elif self.parallel == 'tree':
+            counts = self._run_tree_parallel(num)
+        else:
+            if not self.processes:
+                self._start_workers()
+            # the main process takes the first share while the workers run theirs
+            shares = [num//self.workers + (index < num % self.workers) for index in range(self.workers)]
+            for conn, share in zip(self.connections, shares[1:]):
+                conn.send(('run', share))
+            x_win_total, o_win_total, tie_total = _count_outcomes(self.tree, shares[0])
+            self.visits, self.values = _root_statistics(self.tree)
+            for conn in self.connections:
+                (x_wins, o_wins, ties), (visits, values), (roll_outs, plies) = conn.recv()
+                x_win_total += x_wins
+                o_win_total += o_wins
+                tie_total += ties
+                self.visits += visits
+                self.values += values
+                # the roll-outs of the workers count towards the search
+                self.tree.roll_outs += roll_outs
+                self.tree.roll_out_plies += plies
+            counts = x_win_total, o_win_total, tie_total
+        return counts, sum(counts)
+
+    def run_simulation(self, num: int = None, time_limit: float = None, min_simulation: int = 1):
+        '''
+        num: int -- the number of simulations, the largest number when there is a time limit, None for no limit
+        time_limit: float -- the seconds to spend, checked every CHUNK simulations per worker
+                             so the search may overrun it by a chunk, None to run exactly num simulations
+        min_simulation: int -- the smallest number of simulations run under a time limit
+        the simulations stop early once the root is solved, the work of the search is counted in stats
+        pondering is stopped first
+        return the rates of (x wins, o wins, ties) over the roll-outs
+        '''
+        assert num is not None or time_limit is not None, 'the search needs a number of simulations or a time limit'
+        assert num is None or min_simulation <= num, 'the minimum number of simulations exceeds the maximum'
+        # a search in the foreground takes over the tree from the pondering thread
+        self.stop_pondering()
+        self.stats = SimulationStats()
+        self.tree.roll_outs = self.tree.roll_out_plies = 0
+        x_win_total = o_win_total = tie_total = 0
+        simulations = 0
+        while True:
+            size = num - simulations if time_limit is None else self.CHUNK*self.workers
+            if num is not None:
+                size = min(size, num - simulations)
+            (x_wins, o_wins, ties), done = self._run(size)
+            x_win_total += x_wins
+            o_win_total += o_wins
+            tie_total += ties
+            simulations += done
+            if simulations == num or self.tree.is_solved():
+                break
+            self.stats.update_time()
+            if time_limit is not None and simulations >= min_simulation and self.stats.elapsed >= time_limit:
+                break
+        self.stats.update_time()
+        self.stats.simulations = simulations
+        self.stats.roll_outs = self.tree.roll_outs
+        self.stats.roll_out_plies = self.tree.roll_out_plies
+
+        # a batch of roll-outs from one leaf counts as a single simulation,
+        # and the simulations stop early once the root is solved
+        total = x_win_total + o_win_total + tie_total
+        assert total <= simulations*self.batch_size, f'sum of totals is inconsistent with the number of simulations'
+        if total == 0:  # the root was solved before
+            outcome = self.tree.root_outcome()
+            return (float(outcome == X_WIN), float(outcome == O_WIN), float(outcome == TIE))
+
+        return (x_win_total/total, o_win_total/total, tie_total/total)
+
+    def _ponder(self):
+        while not self.stop_event.is_set() and not self.tree.is_solved():
+            # one simulation per worker at a time, so that stopping waits for little work
+            _, done = self._run(self.workers)
+            self.pondered += done
+
+    def ponder(self):
+        '''
+        keep running simulations from the root in a background thread until stop_pondering is called,
+        e.g. on the opponent's time after move_and_truncate; nothing else may use the search meanwhile
+        '''
+        if self.ponder_thread is not None or self.tree.game.outcome != INCOMPLETE:
+            return
+        self.stop_event.clear()
+        self.pondered = 0
+        self.ponder_thread = threading.Thread(target=self._ponder, daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        '''
+        stop the pondering thread once its current simulations are backed up
+        return the number of simulations run while pondering
+        '''
+        if self.ponder_thread is None:
+            return 0
+        self.stop_event.set()
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        return self.pondered
+
+    def get_distribution(self):
+        '''
+        return (array of moves, array of visit counts) of the root, added up over the trees of the workers
+        '''
+        if self.workers == 1 or self.parallel == 'tree':
+            return self.tree.get_distribution()
+        moves = np.flatnonzero(self.visits)
+        return moves, self.visits[moves]
 
     def move_and_truncate(self) -> int:
         '''
-        1. select a move from the simulation distribution
+        1. select a move from the simulation distribution,
+           or the best proven move when the root is solved
         2. transfer the root to the subtree resulted from the move
         return the next move
         '''
-        moves, visit_counts = self.root.get_distribution()
-        probs = visit_counts/np.sum(visit_counts)
-        next_move = np.random.choice(moves, p = probs)
+        next_move = self.tree.proven_move()
+        if next_move is None:
+            moves, visit_counts = self.get_distribution()
+            # the moves proven to lose are played only when every move loses
+            losing = np.isin(moves, self.tree.losing_moves())
+            if not losing.all():
+                visit_counts = np.where(losing, 0, visit_counts)
+                if not np.any(visit_counts):
+                    visit_counts = (~losing).astype(float)
+            probs = visit_counts/np.sum(visit_counts)
+            next_move = np.random.choice(moves, p = probs)
 
-        next_node = self.root.edges[next_move].get_node()
-        self.root = next_node
+        self.tree.advance(next_move)
+        for conn in self.connections:
+            conn.send(('advance', next_move))
 
         return next_move
-    
+
     def truncate(self, state: dict) -> None:
-        prev_move = state['previous_move']
-        try:
-            next_node = self.root.edges[prev_move].get_node()
-            assert next_node is not None, 'next node is None'
-            assert equal_state(next_node.state, state), 'state not equal'
-            self.root = next_node
-        except (KeyError, AssertionError):
-            new_node = TreeNode(state, self.player, self.C)
-            self.root = new_node
-        
-       
-    
-        
-        
-
-        
+        self.tree.truncate(state)
+        for conn in self.connections:
+            conn.send(('truncate', state))
+
+    def close(self):
+        '''
+        stop pondering and the worker processes
+        '''
+        self.stop_pondering()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        for conn, process in zip(self.connections, self.processes):
+            conn.send(('close',))
+            process.join()
+            conn.close()
+        self.connections = []
+        self.processes = []
@@ -0,0 +1,207 @@
+import argparse
+import os
+import random
+from collections import namedtuple
+from time import time
+
+import numpy as np
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from players.random_player import RandomPlayer
+from utils.hash_utils import hash_state
+
+from mcts.array_tree import NO_CHILD, ArrayTree
+
+MAGIC = int.from_bytes(b'UTTTBOOK', 'little')
+VERSION = 1
+# magic, version, capacity, count, top_k
+HEADER_WORDS = 5
+# give up on a lookup after scanning this many slots
+MAX_PROBES = 64
+
+VISIT_BITS = 27
+MAX_VISITS = (1 << VISIT_BITS) - 1
+
+# the statistics of a book move, value is the mean outcome in [-1, 1] for the player to move
+BookMove = namedtuple('BookMove', ['move', 'visits', 'value'])
+
+
+def pack_move(move: int, visits: int, total_value: int):
+    '''
+    pack a move with its visit count and the sum of its outcomes into a word:
+    move + 1 in the low 8 bits, then the visits, then total_value + visits which is never negative
+    '''
+    visits = min(visits, MAX_VISITS)
+    total_value = max(-visits, min(total_value, visits))
+    return (move + 1) | (visits << 8) | ((total_value + visits) << (8 + VISIT_BITS))
+
+
+def unpack_move(data: int):
+    visits = (data >> 8) & MAX_VISITS
+    total_value = (data >> (8 + VISIT_BITS)) - visits
+    return BookMove((data & 0xff) - 1, visits, total_value/visits if visits else 0.0)
+
+
+class OpeningBook:
+    '''
+    the statistics of the best moves of opening positions kept in a file that is accessed through mmap
+    the file is an open-addressed hash table keyed by the position hash with linear probing,
+    every slot holds the key + 1 followed by up to top_k packed moves, most visited first,
+    so a lookup reads a few words and the players get their opening moves without searching
+    path: the file of the book, created when it does not exist
+    capacity: the number of slots of a new book, rounded up to a power of 2
+    top_k: the number of moves kept per position in a new book
+    '''
+
+    def __init__(self, path: str, capacity: int = 2**12, top_k: int = 4) -> None:
+        self.path = path
+        if not os.path.exists(path):
+            capacity = 1 << max(capacity - 1, 1).bit_length()
+            words = np.memmap(path, dtype=np.uint64, mode='w+',
+                              shape=(HEADER_WORDS + (1 + top_k)*capacity,))
+            words[:HEADER_WORDS] = (MAGIC, VERSION, capacity, 0, top_k)
+            words.flush()
+            del words
+        self._map()
+
+    def _map(self):
+        self.words = np.memmap(self.path, dtype=np.uint64, mode='r+')
+        magic, version, capacity, _, top_k = (int(word) for word in self.words[:HEADER_WORDS])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{self.path} is not an opening book of version {VERSION}')
+        self.capacity = capacity
+        self.top_k = top_k
+        self.header = self.words[:HEADER_WORDS]
+        self.slots = self.words[HEADER_WORDS:].reshape(capacity, 1 + top_k)
+
+    def __getstate__(self):
+        # a pickled book reopens the same file in the receiving process
+        return {'path': self.path}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state['path'])
+
+    def __len__(self):
+        return int(self.header[3])
+
+    def _find(self, key: int):
+        '''
+        return the index of the slot holding the key or of the empty slot where it belongs,
+        None if neither is found within MAX_PROBES slots
+        '''
+        stored_key = key + 1  # 0 marks an empty slot
+        index = key & (self.capacity - 1)
+        for _ in range(MAX_PROBES):
+            slot_key = int(self.slots[index, 0])
+            if slot_key == stored_key or slot_key == 0:
+                return index
+            index = (index + 1) & (self.capacity - 1)
+        return None
+
+    def probe(self, state: dict):
+        '''
+        return the book moves of the state, most visited first, None if the state is not in the book
+        '''
+        key = hash_state(state)
+        index = self._find(key)
+        if index is None or int(self.slots[index, 0]) != key + 1:
+            return None
+        return [unpack_move(int(data)) for data in self.slots[index, 1:] if data != 0]
+
+    def best_move(self, state: dict):
+        '''
+        return the most visited book move of the state, None if the state is not in the book
+        '''
+        moves = self.probe(state)
+        return moves[0].move if moves else None
+
+    def store(self, state: dict, moves: list):
+        '''
+        moves: list -- (move, visits, total value) of the moves of the state, most visited first,
+                       only the first top_k are kept
+        '''
+        key = hash_state(state)
+        index = self._find(key)
+        assert index is not None, f'{self.path} is full'
+        if int(self.slots[index, 0]) == 0:
+            self.header[3] += 1
+        row = [pack_move(*move) for move in moves[:self.top_k]]
+        self.slots[index, 1:] = row + [0]*(self.top_k - len(row))
+        self.slots[index, 0] = key + 1
+
+    def flush(self):
+        self.words.flush()
+
+    def close(self):
+        self.flush()
+        self.words = self.header = self.slots = None
+
+
+def build_book(path: str, plies: int = 4, num_simulation: int = 10000, top_k: int = 3,
+               explore_factor: float = 1.4, seed: int = 0, verbose: bool = False):
+    '''
+    path: str -- the file of the book, replaced when it exists
+    plies: int -- the number of plies from the start covered by the book
+    num_simulation: int -- the number of simulations behind the statistics of every position
+    top_k: int -- the number of most visited moves kept per position, only their lines are followed
+    search every position along the top_k lines of the first plies with MCTS and store the
+    statistics of its most visited moves; the tree is shared along the lines, so the simulations
+    already spent below a position count towards its own num_simulation
+    return the number of positions in the book
+    '''
+    random.seed(seed)
+    np.random.seed(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    # keep the table at most half full
+    book = OpeningBook(path, capacity=2*sum(top_k**ply for ply in range(plies)), top_k=top_k)
+
+    tree = ArrayTree(UltimateTTT(None, None).get_state(), RandomPlayer(), explore_factor)
+    start = time()
+    # the root of the tree moves to the position on top of the stack, the rest of the tree is kept
+    stack = [(tree.root, tree.game, 0)]
+    while stack:
+        node, game, ply = stack.pop()
+        if game.outcome != INCOMPLETE:
+            continue
+        tree.move_root(node, game)
+        if tree.first_child[node] == NO_CHILD:
+            tree.expand(node, game.next_valid_moves)
+        children = tree.children(node)
+        while tree.visits[children].sum() < num_simulation and not tree.is_solved():
+            tree.simulate()
+
+        moves, visits, values = tree.move[children], tree.visits[children], tree.value_sum[children]
+        ranked = np.argsort(-visits, kind='stable')[:top_k]
+        book.store(game.get_state(), [(int(moves[index]), int(visits[index]), int(values[index])) for index in ranked])
+        if verbose:
+            print(f'ply {ply}: ' + ', '.join(f'{moves[index]} ({visits[index]})' for index in ranked), flush=True)
+        if ply + 1 < plies:
+            for index in ranked:
+                child = tree.child[children.start + index]
+                if child != NO_CHILD:
+                    child_game = game.copy()
+                    child_game.update_state(int(moves[index]))
+                    stack.append((child, child_game, ply + 1))
+
+    positions = len(book)
+    book.close()
+    if verbose:
+        print(f'{positions} positions in {time() - start:.1f}s written to {path}')
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='build an opening book with MCTS')
+    parser.add_argument('path')
+    parser.add_argument('--plies', type=int, default=4)
+    parser.add_argument('--simulations', type=int, default=10000)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--explore-factor', type=float, default=1.4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    build_book(args.path, args.plies, args.simulations, args.top_k, args.explore_factor, args.seed, verbose=True)
+
+
+if __name__ == '__main__':
+    main()
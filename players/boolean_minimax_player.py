@@ -1,29 +1,74 @@
 from players.player import Player
 from solvers.boolean_minimax import BooleanMinimax
+from solvers.root_split import RootSplit
+from solvers.transposition import new_table, renew_table
 from env.macros import *
+from time import time
 class BooleanMinimaxPlayer(Player):
-    def __init__(self, verbose=False) -> None:
-        super().__init__()
+    '''
+    workers: split the root moves across this many worker processes when larger than 1
+    tt: the transposition table kept across the moves of a game, by default a new TranspositionTable,
+        or a SharedTranspositionTable with workers, renewed by reset; pass a SolvedStore to share
+        its proofs across games
+    time_limit: the number of seconds a move may take, when it runs out the best move found so far is played
+    book: an optional OpeningBook whose moves are played without searching
+    '''
+    def __init__(self, workers=1, tt=None, time_limit=None, book=None, verbose=False) -> None:
+        super().__init__(book)
+        self.workers = workers
+        # a table given by the caller is kept as is between games
+        self.own_tt = tt is None
+        self.tt = new_table(workers) if self.own_tt else tt
+        self.time_limit = time_limit
         self.verbose = verbose
+
+    def _create_solver(self, state: dict, bounded: bool):
+        if self.workers > 1:
+            return RootSplit(BooleanMinimax, state, self.workers, bounded=bounded, tt=self.tt)
+        return BooleanMinimax(state, bounded=bounded, tt=self.tt)
+
     def move(self, state: dict):
+        book_move = self.book_move(state)
+        if book_move is not None:
+            if self.verbose:
+                print(f"Boolean Minimax plays {book_move} from the opening book.")
+            return book_move
         player = state['current_player']
         player_map ={X:'X', O:'O'}
 
-        bounded_solver = BooleanMinimax(state, bounded=True)
-        exact_solver = BooleanMinimax(state, bounded=False)
+        bounded_solver = self._create_solver(state, bounded=True)
+        exact_solver = self._create_solver(state, bounded=False)
 
-        bounded_res, bounded_move = bounded_solver.run()
-        if not bounded_res: # root player is losing
+        start = time()
+        bounded_res, bounded_move, stats = bounded_solver.solve(time_limit=self.time_limit)
+        if self.verbose:
+            print(f"Boolean Minimax searched {stats.summary()} for the bounded result.")
+        if bounded_res is None: # out of time
+            if self.verbose:
+                print(f"Boolean Minimax ran out of time, player {player_map[player]} plays the most promising move")
+            return bounded_move
+        elif not bounded_res: # root player is losing
             if self.verbose:
                 print(f"Boolean Minimax says it's a loss for player {player_map[player]}")
             return bounded_move
         else: # root player is at least drawing
-            exact_res, exact_move = exact_solver.run()
+            # the exact search gets what is left of the time
+            time_limit = None if self.time_limit is None else max(self.time_limit - (time() - start), 0)
+            exact_res, exact_move, stats = exact_solver.solve(time_limit=time_limit)
+            if self.verbose:
+                print(f"Boolean Minimax searched {stats.summary()} for the exact result.")
             if exact_res: # root player is winning
                 if self.verbose:
                     print(f"Boolean Minimax says it's a win for player {player_map[player]}")
                 return exact_move
-            else: # root player is tying
+            else: # root player is tying, or at least drawing when out of time
                 if self.verbose:
-                    print(f"Boolean Minimax says it's a tie for player {player_map[player]}")
-                return bounded_move
\ No newline at end of file
+                    if exact_res is None:
+                        print(f"Boolean Minimax ran out of time, player {player_map[player]} is at least drawing")
+                    else:
+                        print(f"Boolean Minimax says it's a tie for player {player_map[player]}")
+                return bounded_move
+
+    def reset(self):
+        if self.own_tt:
+            self.tt = renew_table(self.tt)
\ No newline at end of file
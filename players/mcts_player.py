@@ -1,3 +1,4 @@
+from env.macros import *
 from mcts.core import MCTS
 
 from players.player import Player
@@ -5,31 +6,86 @@ from players.random_player import RandomPlayer
 
 
 class MCTSPlayer(Player):
-    def __init__(self, roll_out_player = None, num_simulation=500, explore_factor=1.4, verbose=False) -> None:
-        super().__init__()
+    '''
+    tablebase: an optional SolvedStore whose exact results end the roll-outs early
+    book: an optional OpeningBook whose moves are played without simulating
+    workers: the number of processes searching in parallel, the simulations of a move are shared among them
+    parallel: "root" to grow an independent tree in every worker and add up their root statistics,
+              "tree" to grow a single tree whose roll-outs run in the workers, see MCTS
+    batch_size, batch_leaves: play the random roll-outs in NumPy batches, see MCTS
+    transpositions: share the nodes of transposed positions in the tree, see ArrayTree
+    rave: the equivalence parameter of RAVE, 0 for plain UCT, see ArrayTree
+    max_nodes: the budget of nodes of the tree, which keeps the memory flat over a long match, see ArrayTree
+    cutoff, evaluator: stop the roll-outs after cutoff plies and score the positions with the evaluator,
+                       the static evaluation by default, see ArrayTree
+    time_limit: the seconds to spend on a move, None to always run num_simulation simulations;
+                under a time limit num_simulation is the largest number of simulations, None for no limit
+    min_simulation: the smallest number of simulations per move under a time limit
+    ponder: keep searching from the position after each move on the opponent's time, the search is
+            stopped and truncated to the reply by the next call to move; call reset to stop it after a game
+    '''
+    def __init__(self, roll_out_player = None, num_simulation=500, explore_factor=1.4, tablebase=None, book=None, workers=1, parallel='root', batch_size=1, batch_leaves=False, transpositions=False, rave=0, max_nodes=None, cutoff=None, evaluator=None, time_limit=None, min_simulation=1, ponder=False, verbose=False) -> None:
+        super().__init__(book)
         self.player = RandomPlayer() if roll_out_player is None else roll_out_player
         self.mcts_agent = None
         self.num_sim = num_simulation
         self.C = explore_factor
+        self.time_limit = time_limit
+        self.min_simulation = min_simulation
+        self.tablebase = tablebase
+        self.workers = workers
+        self.parallel = parallel
+        self.batch_size = batch_size
+        self.batch_leaves = batch_leaves
+        self.transpositions = transpositions
+        self.rave = rave
+        self.max_nodes = max_nodes
+        self.cutoff = cutoff
+        self.evaluator = evaluator
+        self.ponder = ponder
         self.verbose = verbose
 
     def move(self, state: dict):
+        if self.mcts_agent is not None:
+            pondered = self.mcts_agent.stop_pondering()
+            if self.verbose and pondered:
+                print(f"MCTS pondered {pondered} simulations on the opponent's time")
+
+        book_move = self.book_move(state)
+        if book_move is not None:
+            if self.verbose:
+                print(f'MCTS plays {book_move} from the opening book')
+            # the tree no longer follows the game, truncate starts a new one once out of the book
+            return book_move
 
         if self.mcts_agent is None:
-            self.mcts_agent = MCTS(state, self.player, self.C)
+            self.mcts_agent = MCTS(state, self.player, self.C, self.tablebase, self.workers, self.parallel,
+                                   batch_size=self.batch_size, batch_leaves=self.batch_leaves,
+                                   transpositions=self.transpositions, rave=self.rave,
+                                   max_nodes=self.max_nodes, cutoff=self.cutoff, evaluator=self.evaluator)
         else:
             self.mcts_agent.truncate(state)
 
         x_win_rate, o_win_rate, tie_rate = self.mcts_agent.run_simulation(
-            self.num_sim)
+            self.num_sim, self.time_limit, self.min_simulation)
         if self.verbose:
+            print(f'MCTS ran {self.mcts_agent.stats.summary()}')
             print(
                 f'MCTS says the probability of X winning is {x_win_rate:.2%}')
             print(
                 f'MCTS says the probability of O winning is {o_win_rate:.2%}')
             print(f'MCTS says the probability of tying is {tie_rate:.2%}')
+            outcome = self.mcts_agent.tree.root_outcome()
+            if outcome is not None:
+                outcome_map = {X_WIN: 'a win for player X', O_WIN: 'a win for player O', TIE: 'a tie'}
+                print(f'MCTS proved that the game is {outcome_map[outcome]}')
 
-        return self.mcts_agent.move_and_truncate()
+        next_move = self.mcts_agent.move_and_truncate()
+        if self.ponder:
+            self.mcts_agent.ponder()
+        return next_move
 
     def reset(self):
+        if self.mcts_agent is not None:
+            self.mcts_agent.close()
         self.mcts_agent = None
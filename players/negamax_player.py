@@ -1,16 +1,44 @@
 from players.player import Player
 from solvers.negamax import NegaMax
+from solvers.root_split import RootSplit
+from solvers.transposition import new_table, renew_table
 from env.macros import *
 class NegamaxPlayer(Player):
-    def __init__(self, verbose=False) -> None:
-        super().__init__()
+    '''
+    workers: split the root moves across this many worker processes when larger than 1
+    tt: the transposition table kept across the moves of a game, by default a new TranspositionTable,
+        or a SharedTranspositionTable with workers, renewed by reset; pass a SolvedStore to share
+        its proofs across games
+    time_limit: the number of seconds a move may take, when it runs out the best move found so far is played
+    book: an optional OpeningBook whose moves are played without searching
+    '''
+    def __init__(self, workers=1, tt=None, time_limit=None, book=None, verbose=False) -> None:
+        super().__init__(book)
+        self.workers = workers
+        # a table given by the caller is kept as is between games
+        self.own_tt = tt is None
+        self.tt = new_table(workers) if self.own_tt else tt
+        self.time_limit = time_limit
         self.verbose = verbose
     def move(self, state: dict):
+        book_move = self.book_move(state)
+        if book_move is not None:
+            if self.verbose:
+                print(f"Negamax plays {book_move} from the opening book.")
+            return book_move
         player = state['current_player']
-        solver = NegaMax(state)
-        best_score, best_move = solver.run()
+        solver = NegaMax(state, tt=self.tt) if self.workers == 1 else RootSplit(NegaMax, state, self.workers, tt=self.tt)
+        best_score, best_move, stats = solver.solve(time_limit=self.time_limit)
         if self.verbose:
             outcome_map = {1:'win', 0:'tie', -1:'loss'}
             player_map ={X:'X', O:'O'}
-            print(f"Negamax says it's a {outcome_map[best_score]} for player {player_map[player]}.")
-        return best_move
\ No newline at end of file
+            if stats.proven:
+                print(f"Negamax says it's a {outcome_map[best_score]} for player {player_map[player]}.")
+            else:
+                print(f"Negamax ran out of time, player {player_map[player]} plays the best move found so far.")
+            print(f"Negamax searched {stats.summary()}.")
+        return best_move
+
+    def reset(self):
+        if self.own_tt:
+            self.tt = renew_table(self.tt)
\ No newline at end of file
@@ -1,7 +1,24 @@
 # base class to inherit
 class Player:
-    def __init__(self) -> None:
-        pass
+    '''
+    book: an optional OpeningBook whose moves are played without searching
+    '''
+    def __init__(self, book=None) -> None:
+        self.book = book
 
     def move(self, state: dict):
         raise NotImplementedError
+
+    def book_move(self, state: dict):
+        '''
+        return the move of the opening book for the state, None when the state is not in the book
+        '''
+        if self.book is None:
+            return None
+        return self.book.best_move(state)
+
+    def reset(self):
+        '''
+        forget what was kept from the previous moves, called between games
+        '''
+        pass
@@ -1,12 +1,42 @@
 from env.ultimate_ttt import UltimateTTT
 from env.macros import *
+from solvers.solver import Solver
+from solvers.transposition import EXACT, LOWER, UPPER
 
 
-class AlphaBeta:
-    def __init__(self, state: dict) -> None:
+class AlphaBeta(Solver):
+    '''
+    tt: an optional transposition table shared with other solvers
+    history: an optional list of 81 scores of moves that caused cutoffs,
+             the moves are tried in decreasing order of score and the list is updated in place
+    '''
+    def __init__(self, state: dict, tt=None, history: list = None) -> None:
+        super().__init__()
         self.game = UltimateTTT(None, None, state)
+        self.root_depth = len(self.game.history)
+        self.tt = tt
+        self.history = history
 
-    def run(self, alpha, beta) -> int:
+    def _order(self, valid_moves: tuple, tt_move: int):
+        '''
+        return the moves in search order: the move from the table first, then by history score
+        '''
+        if self.history is None and tt_move is None:
+            return valid_moves
+        moves = list(valid_moves)
+        if self.history is not None:
+            moves.sort(key=lambda move: self.history[move], reverse=True)
+        if tt_move is not None and tt_move in valid_moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+    def run(self, alpha=-1, beta=1) -> int:
+        '''
+        return a (score, best move), the window defaults to the
+        full range of scores since a game is bounded by [-1, 1]
+        '''
+        self._visit(len(self.game.history) - self.root_depth, self.game.outcome != INCOMPLETE)
         # statically evaluate
         if self.game.outcome == X_WIN:
             return (1, None) if self.game.current_player == X else (-1, None)
@@ -15,8 +45,23 @@ class AlphaBeta:
         elif self.game.outcome == TIE:
             return (0, None)
         else:
-            valid_moves = self.game.next_valid_moves
-            for move in valid_moves:
+            tt_move = None
+            at_root = len(self.game.history) == self.root_depth
+            if self.tt is not None:
+                key = self.game.get_hash()
+                entry = self._probe_table(key)
+                # the root has to answer a move, which the entries of the boolean solvers lack
+                if entry is not None and (entry.move is not None or not at_root):
+                    if entry.is_exact() or entry.lower() >= beta or entry.upper() <= alpha:
+                        return (entry.value, entry.move)
+                    tt_move = entry.move
+
+            original_alpha = alpha
+            valid_moves = self._order(self.game.next_valid_moves, tt_move)
+            best_move = valid_moves[0]
+            if at_root:
+                self.partial = (None, best_move)
+            for index, move in enumerate(valid_moves):
                 self.game.update_state(move)
                 score, _ = self.run(-beta, -alpha)
                 score = -score
@@ -25,8 +70,24 @@ class AlphaBeta:
                 # update alpha
                 if (score > alpha):
                     alpha = score
+                    best_move = move
+                if at_root:
+                    self.partial = (alpha, best_move)
                 # beta cut
                 if (score >= beta):
-                    return (beta, move)
+                    alpha = beta
+                    self._cutoff(index)
+                    if self.history is not None:
+                        # cutoffs close to the root save more work
+                        self.history[move] += 81 - len(self.game.history)
+                    break
 
-            return (alpha, move)
\ No newline at end of file
+            if self.tt is not None:
+                if alpha <= original_alpha:
+                    bound = UPPER
+                elif alpha >= beta:
+                    bound = LOWER
+                else:
+                    bound = EXACT
+                self.tt.store(key, alpha, bound, best_move, len(self.game.history))
+            return (alpha, best_move)
\ No newline at end of file
@@ -1,13 +1,47 @@
 from env.ultimate_ttt import UltimateTTT
 from env.macros import *
+from solvers.solver import Solver
+from solvers.transposition import bound_of, decide
 import random
-class BooleanMinimax:
-    def __init__(self, state:dict, bounded) -> None:
+class BooleanMinimax(Solver):
+    '''
+    root_player: the player whose result we want to seek, the player to move by default
+    tt: an optional transposition table shared with other solvers
+    '''
+    def __init__(self, state:dict, bounded, root_player=None, tt=None) -> None:
+        super().__init__()
         self.game = UltimateTTT(None, None, state)
-        self.root = state['current_player']
+        self.root_depth = len(self.game.history)
+        self.root = state['current_player'] if root_player is None else root_player
         self.bounded = bounded
+        self.tt = tt
+        # the score the root player has to reach
+        self.threshold = 0 if bounded else 1
+
+    def _probe(self, key: int, satisfied: bool):
+        '''
+        key: int -- the hash of the current position
+        satisfied: bool -- the result for which the node has a move to show (True for or nodes)
+        return the (result, move) known from the table, None if unknown
+        '''
+        entry = self._probe_table(key)
+        if entry is None:
+            return None
+        root_to_move = self.game.current_player == self.root
+        result = decide(entry, self.threshold, root_to_move)
+        if result is None:
+            return None
+        if result == satisfied and entry.move is not None:
+            return result, entry.move
+        return result, random.choice(self.game.next_valid_moves)
+
+    def _store(self, key: int, result: bool, move: int):
+        root_to_move = self.game.current_player == self.root
+        value, bound = bound_of(result, self.threshold, root_to_move)
+        self.tt.store(key, value, bound, move, len(self.game.history))
     
     def boolean_or(self) -> bool:
+        self._visit(len(self.game.history) - self.root_depth, self.game.outcome != INCOMPLETE)
         # statically evaluate
         if self.game.outcome == X_WIN:
             return (self.root==X), None
@@ -17,17 +51,32 @@ class BooleanMinimax:
             # tie is considered True if seeking bounded result, otherwise False
             return self.bounded, None
         else:
+            if self.tt is not None:
+                key = self.game.get_hash()
+                known = self._probe(key, satisfied=True)
+                if known is not None:
+                    return known
+
             legal_moves = self.game.next_valid_moves
-            for move in legal_moves:
+            at_root = len(self.game.history) == self.root_depth
+            for index, move in enumerate(legal_moves):
+                if at_root:  # the moves before it are refuted, this one might still hold
+                    self.partial = (None, move)
                 self.game.update_state(move)
                 result, _ = self.boolean_and()
                 self.game.undo()
                 if result:
+                    self._cutoff(index)
+                    if self.tt is not None:
+                        self._store(key, True, move)
                     return True, move # if one of them safisfies the condition, then it's True
 
+            if self.tt is not None:
+                self._store(key, False, None)
             return False, random.choice(legal_moves)
 
     def boolean_and(self) -> bool:
+        self._visit(len(self.game.history) - self.root_depth, self.game.outcome != INCOMPLETE)
         # statically evaluate
         if self.game.outcome == X_WIN:
             return (self.root == X), None
@@ -37,14 +86,25 @@ class BooleanMinimax:
             # tie is considered True if seeking bounded result, otherwise False
             return self.bounded, None
         else:
+            if self.tt is not None:
+                key = self.game.get_hash()
+                known = self._probe(key, satisfied=False)
+                if known is not None:
+                    return known
+
             legal_moves = self.game.next_valid_moves
-            for move in legal_moves:
+            for index, move in enumerate(legal_moves):
                 self.game.update_state(move)
                 result, _ = self.boolean_or()
                 self.game.undo()
                 if not result:
+                    self._cutoff(index)
+                    if self.tt is not None:
+                        self._store(key, False, move)
                     return False, move # if one of them does not satisfy the condition, then it's False
 
+            if self.tt is not None:
+                self._store(key, True, None)
             return True, random.choice(legal_moves)
 
 
@@ -1,12 +1,18 @@
 from env.ultimate_ttt import UltimateTTT
 from env.macros import *
-class NegaMax:
+from solvers.solver import Solver
+from solvers.transposition import EXACT
+class NegaMax(Solver):
     '''
     game: a game object
     target: the player whose result we want to seek (X or O)
+    tt: an optional transposition table shared with other solvers
     '''
-    def __init__(self, state:dict) -> None:
+    def __init__(self, state:dict, tt=None) -> None:
+        super().__init__()
         self.game = UltimateTTT(None, None, state)
+        self.root_depth = len(self.game.history)
+        self.tt = tt
     
     def run(self):
         '''
@@ -15,6 +21,7 @@ class NegaMax:
         score 0 denotes tie
         score -1 denotes loss for the current player
         '''
+        self._visit(len(self.game.history) - self.root_depth, self.game.outcome != INCOMPLETE)
         # statically evaluate respect to the current player
         if self.game.outcome == X_WIN:
             return (1, None) if self.game.current_player == X else (-1, None)
@@ -23,9 +30,17 @@ class NegaMax:
         elif self.game.outcome == TIE:
             return (0, None)
         else:
+            at_root = len(self.game.history) == self.root_depth
+            if self.tt is not None:
+                key = self.game.get_hash()
+                entry = self._probe_table(key)
+                # the root has to answer a move, which the entries of the boolean solvers lack
+                if entry is not None and entry.is_exact() and (entry.move is not None or not at_root):
+                    return (entry.value, entry.move)
+
             valid_moves = self.game.next_valid_moves
             max_score = -2
-            for move in valid_moves:
+            for index, move in enumerate(valid_moves):
                 self.game.update_state(move)
                 # not interested in the best move for the opponent
                 score, _ = self.run()
@@ -35,10 +50,15 @@ class NegaMax:
                 if score > max_score:
                     max_score = score
                     best_move = move
+                if at_root:
+                    self.partial = (max_score, best_move)
 
                 # is a win postion already, prone the rest
                 if max_score == 1:
-                    return (1, best_move)
+                    self._cutoff(index)
+                    break
 
+            if self.tt is not None:
+                self.tt.store(key, max_score, EXACT, best_move, len(self.game.history))
             return (max_score, best_move)
         
\ No newline at end of file
@@ -0,0 +1,68 @@
+import numpy as np
+from env.macros import *
+from jax.nn import softmax
+from utils.alphazero_utils import create_forward, evaluate_states, load_checkpoint
+
+from solvers.pns_init import Initializer, value_to_numbers
+
+
+class NeuralInitializer(Initializer):
+    '''
+    seed the numbers with the value and policy heads of the alphazero network
+    forward_func: callable -- maps a batch of features to (values, logits)
+    scale: float -- the largest amount added on top of the uniform initialization
+    prior_weight: float -- how strongly the move priors of the parent rescale the numbers
+    '''
+
+    def __init__(self, forward_func, scale: float = 4.0, prior_weight: float = 0.5) -> None:
+        self.forward = forward_func
+        self.scale = scale
+        self.prior_weight = prior_weight
+
+    @classmethod
+    def from_checkpoint(cls, train_steps: int, dir_path: str, **kwargs):
+        '''
+        build the initializer from a checkpoint saved by alphazero training
+        '''
+        params, model_state, _, _, _ = load_checkpoint(train_steps, dir_path)
+        return cls.from_params(params, model_state, **kwargs)
+
+    @classmethod
+    def from_params(cls, params, model_state, **kwargs):
+        '''
+        build the initializer from the parameters and the state of the network
+        '''
+        return cls(create_forward(params, model_state), **kwargs)
+
+    def __call__(self, state: dict, root_player: int):
+        vals, _ = evaluate_states(self.forward, [state])
+        value = float(vals[0])
+        if state['current_player'] != root_player:
+            value = -value
+        return value_to_numbers(value, self.scale)
+
+    def batch(self, parent_state: dict, moves: list, states: list, root_player: int):
+        '''
+        evaluate the parent and all the children in a single forward pass:
+        the children values seed the numbers and the parent policy rescales them
+        '''
+        vals, logits = evaluate_states(self.forward, [parent_state] + states)
+
+        priors = np.asarray(softmax(logits[0, np.array(moves)])).tolist()
+        child_vals = vals[1:].tolist()
+        is_or_parent = parent_state['current_player'] == root_player
+
+        numbers = []
+        for state, value, prior in zip(states, child_vals, priors):
+            if state['current_player'] != root_player:
+                value = -value
+            pn, dn = value_to_numbers(value, self.scale)
+
+            # a move the network favours is cheaper to prove (or node) or to refute (and node)
+            factor = (1/(len(moves)*prior + 1e-8))**self.prior_weight
+            if is_or_parent:
+                pn *= factor
+            else:
+                dn *= factor
+            numbers.append((pn, dn))
+        return numbers
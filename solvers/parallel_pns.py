@@ -0,0 +1,183 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import time
+
+from utils.process_utils import worker_context
+
+from solvers.pns import PNS, Node
+from solvers.pns_init import Initializer
+from solvers.solver import BudgetExhausted
+from solvers.transposition import SharedTranspositionTable
+
+
+def _prove(state: dict, root_player: int, bounded: bool, initializer: Initializer, max_iterations: int, tt,
+           deadline: float = None, node_limit: int = None):
+    '''
+    run a bounded proof number search on a frontier node in a worker process
+    return the (proof number, disproof number) of the node, the numbers of its children by move,
+    the iterations spent and the stats
+    '''
+    solver = PNS(state, bounded, initializer, root_player=root_player, tt=tt)
+    solver.deadline = deadline
+    solver.node_limit = node_limit
+    solver._search(max_iterations)
+    solver.stats.finish()
+    children = {move: child.get_numbers() for move, child in solver.root.children}
+    return solver.root.get_numbers(), children, solver.iterations, solver.stats
+
+
+class ParallelPNS(PNS):
+    '''
+    proof number search that farms out frontier nodes of the master tree to worker processes
+    every worker runs a bounded proof number search on its node:
+    a solved node keeps the proven numbers, an unsolved one keeps the numbers the worker reached,
+    which rank it against the other leaves as if its subtree was in the master tree; when it is
+    selected again it is expanded in the master tree, its children take the numbers they had in the
+    worker and are handed out in turn. Only the proofs of a job outlive it, through the table,
+    the unsolved nodes below the children of its node are searched again by the later jobs
+    workers: the number of worker processes
+    job_iterations: the expansion budget of a single job
+    tt: an optional transposition table, a SharedTranspositionTable is shared with the workers;
+        with more than one worker and no table the search keeps a SharedTranspositionTable of its own
+    '''
+
+    def __init__(self, state: dict, bounded: bool, workers: int = 4, job_iterations: int = 500,
+                 initializer: Initializer = None, tt=None) -> None:
+        assert workers > 0, 'the number of workers has to be positive'
+        # the table of the search, freed at its end
+        self.own_tt = tt is None and workers > 1
+        super().__init__(state, bounded, initializer, tt=SharedTranspositionTable() if self.own_tt else tt)
+        self.workers = workers
+        self.job_iterations = job_iterations
+        self.worker_iterations = 0
+        # the leaves whose numbers come from a worker, with the numbers of their children in the worker
+        self.searched = {}
+        # the part of the node limit held by the pending jobs
+        self.reserved = 0
+
+    def _select_frontier(self, count: int, busy: set):
+        '''
+        collect up to count unsolved leaves that are not being worked on,
+        visiting the children in most-proving order, the leaves already searched by a worker are split
+        '''
+        frontier = []
+
+        def visit(node: Node):
+            if len(frontier) >= count or node in busy:
+                return
+            if node.is_leaf_node and node in self.searched:
+                if self._nodes_left() is not None and self._nodes_left() <= 0:
+                    return
+                self._split(node, self.searched.pop(node))
+                if node.is_solved() or not self.stats.proven:
+                    return
+            if node.is_leaf_node:
+                frontier.append(node)
+                return
+
+            # the or node chases the smallest proof number, the and node the smallest disproof number
+            index = 0 if node.is_or_node else 1
+            children = sorted((child for _, child in node.children),
+                              key=lambda child: child.get_numbers()[index])
+            for child in children:
+                pn, dn = child.get_numbers()
+                if pn != 0 and dn != 0:
+                    visit(child)
+
+        visit(self.root)
+        return frontier
+
+    def _nodes_left(self):
+        '''
+        return the nodes left of the node limit beside the budgets of the pending jobs, None without a limit
+        '''
+        return None if self.node_limit is None else self.node_limit - self.stats.nodes - self.reserved
+
+    def _split(self, node: Node, numbers: dict = None):
+        '''
+        expand the node in the master tree, note when the budget runs out
+        numbers: dict -- the (proof number, disproof number) of the children by move to seed them with
+        '''
+        node_limit = self.node_limit
+        if node_limit is not None:
+            self.node_limit -= self.reserved
+        try:
+            self._expand(node)
+        except BudgetExhausted:
+            self.stats.proven = False
+        finally:
+            self.node_limit = node_limit
+        if numbers:
+            for move, child in node.children:
+                if move in numbers:
+                    child.pn, child.dn = numbers[move]
+        node.update_proof_number()
+        self.iterations += 1
+
+    def _search(self):
+        '''
+        perform the proof number search with the worker processes
+        the workers share the deadline, the node limit counts the nodes of the master and of the workers
+        and what is left of it is split between the new jobs, net of the budgets of the pending jobs
+        return the evaluation for the root player
+        '''
+        try:
+            return self._search_workers()
+        finally:
+            if self.own_tt:
+                self.tt.close()
+
+    def _search_workers(self):
+        pn, dn = self.root.get_numbers()
+        if pn == 0 or dn == 0:
+            return pn == 0
+
+        self._split(self.root)
+
+        pending = {}
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context()) as executor:
+            pn, dn = self.root.get_numbers()
+            while pn != 0 and dn != 0 and self.stats.proven:
+                if self._out_of_budget():
+                    self.stats.proven = False
+                    break
+                frontier = self._select_frontier(self.workers - len(pending),
+                                                 set(node for node, _ in pending.values()))
+                node_limit = None
+                if self.node_limit is not None and frontier:
+                    node_limit = self._nodes_left() // len(frontier)
+                    if node_limit < 1:  # the pending jobs hold the rest of the budget
+                        frontier = []
+                for node in frontier:
+                    future = executor.submit(_prove, node.state, node.root_player, node.bounded, self.initializer,
+                                             self.job_iterations, self.tt, self.deadline, node_limit)
+                    pending[future] = (node, node_limit or 0)
+                    self.reserved += node_limit or 0
+                if not pending:
+                    # nothing is left to hand out when the splits solved the root or the budget ran out
+                    pn, dn = self.root.get_numbers()
+                    if pn != 0 and dn != 0:
+                        self.stats.proven = False
+                    continue
+
+                timeout = None if self.deadline is None else max(self.deadline - time(), 0)
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node, node_limit = pending.pop(future)
+                    self.reserved -= node_limit
+                    (node_pn, node_dn), children, iterations, stats = future.result()
+                    self.worker_iterations += iterations
+                    self.stats.merge(stats, node.depth)
+
+                    # an unsolved node is split when it is selected again
+                    node.pn, node.dn = node_pn, node_dn
+                    if node_pn != 0 and node_dn != 0:
+                        self.searched[node] = children
+                    node.parent.update_proof_number()
+
+                pn, dn = self.root.get_numbers()
+
+            for future in pending:
+                future.cancel()
+            self.reserved = 0
+
+        return pn == 0
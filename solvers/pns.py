@@ -1,6 +1,9 @@
 from unicodedata import name
 from env.ultimate_ttt import UltimateTTT
 from env.macros import *
+from solvers.pns_init import Initializer, UniformInitializer
+from solvers.solver import BudgetExhausted, Solver
+from solvers.transposition import bound_of, decide
 from typing import TypeVar
 from collections import namedtuple
 
@@ -8,13 +11,22 @@ Node = TypeVar('Node')
 Edge = namedtuple('Edge', ['move', 'child'])
 
 class Node:
-    def __init__(self, state: dict, parent: Node, root_player: int, bounded: bool) -> None:
+    '''
+    tt: an optional transposition table shared with other solvers
+    key: the position hash of the state, required with a transposition table
+    '''
+    def __init__(self, state: dict, parent: Node, root_player: int, bounded: bool, initializer: Initializer,
+                 tt=None, key: int = None) -> None:
         self.state = state
         self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
         self.root_player = root_player
         self.is_leaf_node = True
         self.is_or_node = state['current_player'] == root_player
         self.bounded = bounded
+        self.initializer = initializer
+        self.tt = tt
+        self.key = key
 
         # initialize the proof number and disproof number
         if state['outcome'] == X_WIN:
@@ -39,14 +51,19 @@ class Node:
                 self.pn = float('inf')
                 self.dn = 0
         else:
+            # seeded by the initializer when the parent is expanded
             self.pn = 1
             self.dn = 1
 
         self.children = []
 
+    def is_terminal(self):
+        return self.state['outcome'] != INCOMPLETE
+
     def expand(self):
         '''
         expand the node by initializing its children
+        return the number of children found in the transposition table
         '''
         assert self.state['outcome'] == INCOMPLETE, 'cannot expand terminal state'
         assert len(self.children) == 0, 'node already expanded'
@@ -55,15 +72,70 @@ class Node:
         valid_moves = game.next_valid_moves
         for move in valid_moves:
             game.update_state(move)
-            child = Node(game.get_state(), self, self.root_player, self.bounded)
+            key = game.get_hash() if self.tt is not None else None
+            child = Node(game.get_state(), self, self.root_player,
+                         self.bounded, self.initializer, self.tt, key)
             self.children.append(Edge(move, child))
             game.undo()
 
+        # children already solved in the table become solved leaves
+        hits = 0
+        if self.tt is not None:
+            for _, child in self.children:
+                if not child.is_terminal():
+                    hits += child.probe_table()
+
+        # seed the proof and disproof numbers of the non-terminal children
+        open_children = [edge for edge in self.children
+                         if not edge.child.is_terminal() and not edge.child.is_solved()]
+        if open_children:
+            numbers = self.initializer.batch(self.state,
+                                             [move for move, _ in open_children],
+                                             [child.state for _, child in open_children],
+                                             self.root_player)
+            for (_, child), (pn, dn) in zip(open_children, numbers):
+                child.pn, child.dn = pn, dn
+
         self.is_leaf_node = False
+        return hits
 
     def get_numbers(self):
         return self.pn, self.dn
 
+    def is_solved(self):
+        return self.pn == 0 or self.dn == 0
+
+    def probe_table(self):
+        '''
+        take the proven or disproven numbers if the table knows the result of the node
+        return whether the table has an entry for the node
+        '''
+        entry = self.tt.probe(self.key)
+        if entry is None:
+            return False
+        threshold = 0 if self.bounded else 1
+        result = decide(entry, threshold, self.is_or_node)
+        if result is True:
+            self.pn, self.dn = 0, float('inf')
+        elif result is False:
+            self.pn, self.dn = float('inf'), 0
+        return True
+
+    def store_table(self):
+        '''
+        record the result of a solved node in the table
+        '''
+        proven = self.pn == 0
+        move = None
+        for child_move, child in self.children:
+            # the move that proves an or node or disproves an and node
+            if (self.is_or_node and proven and child.pn == 0) or (not self.is_or_node and not proven and child.dn == 0):
+                move = child_move
+                break
+        threshold = 0 if self.bounded else 1
+        value, bound = bound_of(proven, threshold, self.is_or_node)
+        self.tt.store(self.key, value, bound, move, len(self.state['history']))
+
     def find_equal_child_pn(self, nodes, parent_pn):
         for move, child in nodes:
             pn, _ = child.get_numbers()
@@ -116,33 +188,100 @@ class Node:
             self.pn = sum(child_pns)
             self.dn = min(child_dns)
 
+        if self.tt is not None and self.is_solved():
+            self.store_table()
+
         # recursively update parent proof/disproof numbers
         if self.parent is not None:
             self.parent.update_proof_number()
 
 
-class PNS:
-    def __init__(self, state: dict, bounded: bool) -> None:
+class PNS(Solver):
+    '''
+    state: the state of the root
+    bounded: seek whether the root player is at least drawing instead of winning
+    initializer: seeds the proof and disproof numbers of newly created nodes, uniform by default
+    root_player: the player to prove the result for, the player to move at the root by default
+    tt: an optional transposition table shared with other solvers
+    '''
+    def __init__(self, state: dict, bounded: bool, initializer: Initializer = None, root_player: int = None,
+                 tt=None) -> None:
+        super().__init__()
         self.game = UltimateTTT(None, None, state)
-        root_player = state['current_player']
-        self.root = Node(state, None, root_player, bounded)
+        if root_player is None:
+            root_player = state['current_player']
+        self.initializer = UniformInitializer() if initializer is None else initializer
+        self.tt = tt
+        key = self.game.get_hash() if tt is not None else None
+        self.root = Node(state, None, root_player, bounded, self.initializer, tt, key)
+        self.iterations = 0
 
-    def _search(self):
+    def _search(self, max_iterations: int = None):
         '''
         perform the proof number search
+        max_iterations: int -- stop after this many expansions even if the root is not solved
+        the search also stops when the budget runs out, with the tree left consistent
         return the evaluation for the root player
         '''
         pn, dn = self.root.get_numbers()
         while pn != 0 and dn != 0:
+            if max_iterations is not None and self.iterations >= max_iterations:
+                break
             mpn = self.root.select_MPN()
-            mpn.expand()
+            try:
+                self._expand(mpn)
+            except BudgetExhausted:
+                # the children are created, only their counting was cut short
+                mpn.update_proof_number()
+                self.stats.proven = False
+                break
             mpn.update_proof_number()
+            self.iterations += 1
             pn, dn = self.root.get_numbers()
-        return pn == 0
+        return self.root.pn == 0
+
+    def _expand(self, node: Node):
+        '''
+        expand the node and record its children as visited
+        '''
+        hits = node.expand()
+        for _, child in node.children:
+            self._visit(child.depth, child.is_terminal())
+        if self.tt is not None:
+            self.stats.tt_probes += sum(not child.is_terminal() for _, child in node.children)
+            self.stats.tt_hits += hits
+
+    def _probe_root(self):
+        '''
+        return (result, best move) of the root from the table, None when the table cannot settle it
+        or has no move for it, as for the proofs of the boolean solvers
+        '''
+        if self.tt is None or not self.root.is_or_node or self.root.is_terminal():
+            return None
+        entry = self._probe_table(self.root.key)
+        if entry is None or entry.move is None:
+            return None
+        result = decide(entry, 0 if self.root.bounded else 1, True)
+        if result is None:
+            return None
+        self.root.pn, self.root.dn = (0, float('inf')) if result else (float('inf'), 0)
+        return result, entry.move
 
     def run(self):
+        '''
+        return (result, best move), the result is None when the budget ran out before the root was solved
+        the move then leads to the most-proving child
+        a root whose result is in the table is answered without a search
+        '''
+        settled = self._probe_root()
+        if settled is not None:
+            self.stats.proven = True
+            return settled
         result: bool = self._search()
         move: int = self._next_best_move()
+        self.stats.proven = self.root.is_solved()
+        if not self.stats.proven:
+            result = None
         return result, move
 
     def _next_best_move(self):
@@ -0,0 +1,105 @@
+from env.macros import *
+from utils.env_utils import get_valid_moves, inner_to_outer
+from utils.eval_utils import count_threats
+
+
+class Initializer:
+    '''
+    base class to inherit
+    seeds the proof and disproof numbers of a non-terminal node when it is created
+    '''
+
+    def __call__(self, state: dict, root_player: int):
+        '''
+        return the (proof number, disproof number) of the state for the root player
+        '''
+        raise NotImplementedError
+
+    def batch(self, parent_state: dict, moves: list, states: list, root_player: int):
+        '''
+        parent_state: dict -- the state of the node being expanded
+        moves: list -- the moves leading from the parent to each child state
+        states: list -- the non-terminal child states to initialize
+        return the (proof number, disproof number) of every child state
+        '''
+        return [self(state, root_player) for state in states]
+
+
+class UniformInitializer(Initializer):
+    '''
+    the classic initialization, every unexpanded node starts at pn = dn = 1
+    '''
+
+    def __call__(self, state: dict, root_player: int):
+        return 1, 1
+
+
+class MobilityInitializer(Initializer):
+    '''
+    seed the numbers with the number of legal moves:
+    an or node needs all of its children disproved and an
+    and node needs all of its children proved
+    '''
+
+    def __call__(self, state: dict, root_player: int):
+        inner_board = state['inner_board']
+        outer_board = inner_to_outer(inner_board)
+        mobility = len(get_valid_moves(
+            inner_board, outer_board, state['previous_move']))
+
+        if state['current_player'] == root_player:  # or node
+            return 1, mobility
+        else:  # and node
+            return mobility, 1
+
+
+class ThreatInitializer(Initializer):
+    '''
+    seed the numbers with the difference in two-in-a-row threats
+    counted from the static sub-board tables
+    outer_weight: float -- weight of a threat on the outer board relative to one inside a sub-board
+    '''
+
+    def __init__(self, outer_weight: float = 3.0) -> None:
+        self.outer_weight = outer_weight
+
+    def __call__(self, state: dict, root_player: int):
+        inner_board = state['inner_board']
+        outer_board = inner_to_outer(inner_board)
+        opponent = O if root_player == X else X
+
+        root_inner, root_outer = count_threats(
+            inner_board, outer_board, root_player)
+        opp_inner, opp_outer = count_threats(inner_board, outer_board, opponent)
+
+        root_threats = root_inner + self.outer_weight*root_outer
+        opp_threats = opp_inner + self.outer_weight*opp_outer
+        return 1 + max(0, opp_threats - root_threats), 1 + max(0, root_threats - opp_threats)
+
+
+class ValueInitializer(Initializer):
+    '''
+    seed the numbers with a learned evaluation
+    value_func: callable -- maps a state to a value in [-1, 1] for the player to move
+    scale: float -- the largest amount added on top of the uniform initialization
+    '''
+
+    def __init__(self, value_func, scale: float = 4.0) -> None:
+        self.value_func = value_func
+        self.scale = scale
+
+    def __call__(self, state: dict, root_player: int):
+        value = self.value_func(state)
+        if state['current_player'] != root_player:
+            value = -value
+        return value_to_numbers(value, self.scale)
+
+
+def value_to_numbers(value: float, scale: float):
+    '''
+    value: float -- the evaluation with respect to the root player, clipped to [-1, 1]
+    map the evaluation to (proof number, disproof number), the more
+    promising the state is for the root player the smaller the proof number
+    '''
+    proof_prob = (1 + min(max(value, -1.0), 1.0))/2
+    return 1 + scale*(1 - proof_prob), 1 + scale*proof_prob
@@ -0,0 +1,247 @@
+import random
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import Event
+
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+
+from solvers.alpha_beta import AlphaBeta
+from solvers.boolean_minimax import BooleanMinimax
+from solvers.negamax import NegaMax
+from solvers.solver import BudgetExhausted, SearchAborted, SearchStats
+
+# the stop events of the root moves, inherited by every worker process
+_stop_events = None
+
+
+def _init_worker(stop_events):
+    global _stop_events
+    _stop_events = stop_events
+
+
+def _score(solver_cls, state: dict, root_player: int, bounded: bool, group: int, tt,
+           deadline: float = None, node_limit: int = None, alpha: int = None):
+    '''
+    alpha: int -- a score of the root player the state only matters above, AlphaBeta then searches
+                  the null window above it and a score not above alpha is only an upper bound
+    solve the state in a worker process
+    return the score of the state for the root player, None if the search was stopped
+    or ran out of budget, and the stats of the search
+    '''
+    if solver_cls is BooleanMinimax:
+        solver = BooleanMinimax(state, bounded, root_player=root_player, tt=tt)
+    else:
+        solver = solver_cls(state, tt=tt)
+    solver.stop_event = _stop_events[group]
+    solver.deadline = deadline
+    solver.node_limit = node_limit
+
+    try:
+        if solver_cls is BooleanMinimax:
+            if state['current_player'] == root_player:
+                result, _ = solver.boolean_or()
+            else:
+                result, _ = solver.boolean_and()
+            score = int(result)
+        else:
+            if alpha is None:
+                score, _ = solver.run()
+            elif state['current_player'] == root_player:
+                score, _ = solver.run(alpha, alpha + 1)
+            else:
+                score, _ = solver.run(-alpha - 1, -alpha)
+            if state['current_player'] != root_player:
+                score = -score
+    except BudgetExhausted:
+        score = None
+        solver.stats.proven = False
+    except SearchAborted:
+        score = None
+    solver.stats.finish()
+    return score, solver.stats
+
+
+class RootSplit:
+    '''
+    solve a state by splitting the root moves, and optionally the replies
+    to them, across a pool of worker processes
+    each job runs its own solver, the score of a root move is the worst score among its replies
+    and the root takes the first move with the best score, so the result is the same as the
+    sequential solver's. Once a root move is known to win, the jobs of the moves after it are
+    stopped; once a reply refutes a root move, the other replies to that move are stopped.
+    Once a root move is known to draw, the later moves only matter if they win, so the jobs
+    of AlphaBeta submitted after that search the null window above a draw and a move that
+    cannot win is stopped. The jobs are submitted as the workers free up, so they see the
+    latest bound. NegaMax has no window and BooleanMinimax already answers a yes/no
+    question, they only stop on a win or a refutation
+    solver_cls: NegaMax, AlphaBeta or BooleanMinimax
+    workers: the number of worker processes
+    split_depth: 1 to split the root moves, 2 to also split the replies
+    bounded: the bounded argument of BooleanMinimax
+    tt: an optional transposition table, a SharedTranspositionTable is shared with the workers
+    the work of every job, stopped ones included, is added up in stats
+    '''
+
+    def __init__(self, solver_cls, state: dict, workers: int, split_depth: int = 1, bounded: bool = None,
+                 tt=None) -> None:
+        assert solver_cls in (NegaMax, AlphaBeta, BooleanMinimax), f'solver {solver_cls} cannot be split'
+        assert split_depth in (1, 2), f'split depth {split_depth} not supported, accepted depths: 1, 2'
+        assert solver_cls is not BooleanMinimax or bounded is not None, 'BooleanMinimax needs the bounded argument'
+        self.solver_cls = solver_cls
+        self.state = state
+        self.workers = workers
+        self.split_depth = split_depth
+        self.bounded = bounded
+        self.tt = tt
+        self.root_player = state['current_player']
+        self.stats = SearchStats()
+        self.deadline = None
+        self.node_limit = None
+
+        # boolean results are scored 1 for true and 0 for false
+        if solver_cls is BooleanMinimax:
+            self.best, self.worst = 1, 0
+        else:
+            self.best, self.worst = 1, -1
+
+    def _sequential(self):
+        if self.solver_cls is BooleanMinimax:
+            solver = BooleanMinimax(self.state, self.bounded, tt=self.tt)
+        else:
+            solver = self.solver_cls(self.state, tt=self.tt)
+        result, move, self.stats = solver.solve()
+        return result, move
+
+    def _jobs(self):
+        '''
+        return the root moves and a list of (root move index, state to solve, depth of the state)
+        '''
+        game = UltimateTTT(None, None, self.state)
+        moves = game.next_valid_moves
+        jobs = []
+        for index, move in enumerate(moves):
+            game.update_state(move)
+            if self.split_depth == 1 or game.outcome != INCOMPLETE:
+                jobs.append((index, game.get_state(), 1))
+            else:
+                for reply in game.next_valid_moves:
+                    game.update_state(reply)
+                    jobs.append((index, game.get_state(), 2))
+                    game.undo()
+            game.undo()
+        return moves, jobs
+
+    def solve(self, time_limit: float = None, node_limit: int = None):
+        '''
+        time_limit: float -- the number of seconds the search may take, shared by the workers
+        node_limit: int -- the number of nodes a single job may visit
+        return (result, best move, stats) like the solve method of the solvers
+        '''
+        self.stats = SearchStats()
+        self.deadline = None if time_limit is None else self.stats.start + time_limit
+        self.node_limit = node_limit
+        result, move = self.run()
+        self.stats.finish()
+        return result, move, self.stats
+
+    def run(self):
+        '''
+        return the same (result, best move) as the run method of the sequential solver
+        when the budget runs out first, the result is the score of the best move found so far,
+        None when no move is known not to lose
+        '''
+        if self.state['outcome'] != INCOMPLETE:
+            return self._sequential()
+
+        moves, jobs = self._jobs()
+        stop_events = [Event() for _ in moves]
+        group_futures = [[] for _ in moves]
+        remaining = [0]*len(moves)
+        for index, _, _ in jobs:
+            remaining[index] += 1
+        scores = [self.best]*len(moves)  # the worst reply found so far of every root move
+        resolved = [False]*len(moves)
+
+        def stop_group(index):
+            stop_events[index].set()
+            for future in group_futures[index]:
+                future.cancel()
+
+        def window(index):
+            # only a win beats a draw of an earlier move, which a null window above the draw settles
+            if self.solver_cls is AlphaBeta and any(resolved[i] and scores[i] == 0 for i in range(index)):
+                return 0
+            return None
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(stop_events,)) as executor:
+            pending = deque(jobs)
+            futures = {}
+
+            def submit():
+                while pending and len(futures) < self.workers:
+                    index, state, depth = pending.popleft()
+                    if stop_events[index].is_set():
+                        continue
+                    future = executor.submit(_score, self.solver_cls, state, self.root_player, self.bounded,
+                                             index, self.tt, self.deadline, self.node_limit, window(index))
+                    futures[future] = index, depth
+                    group_futures[index].append(future)
+
+            submit()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, depth = futures.pop(future)
+                    if future.cancelled():
+                        continue
+                    score, stats = future.result()
+                    self.stats.merge(stats, depth)
+                    if resolved[index] or score is None:
+                        continue
+
+                    remaining[index] -= 1
+                    scores[index] = min(scores[index], score)
+                    if scores[index] == self.worst or window(index) is not None and scores[index] <= 0:
+                        # refuted, or it cannot beat the draw of an earlier move
+                        resolved[index] = True
+                        stop_group(index)
+                    elif remaining[index] == 0:
+                        resolved[index] = True
+                    if not resolved[index]:
+                        continue
+
+                    for later in range(index + 1, len(moves)):
+                        if scores[index] == self.best:
+                            # a winning root move makes every later move irrelevant
+                            stop_group(later)
+                        elif not resolved[later] and scores[later] <= scores[index]:
+                            resolved[later] = True
+                            stop_group(later)
+                submit()
+
+        # every move before the first winning one has been resolved
+        best_index = None
+        for index in range(len(moves)):
+            if not resolved[index]:
+                continue
+            if best_index is None or scores[index] > scores[best_index]:
+                best_index = index
+            if scores[index] == self.best:
+                break
+
+        winning = best_index is not None and scores[best_index] == self.best
+        if not winning and not all(resolved):  # the budget ran out
+            self.stats.proven = False
+            if best_index is None or scores[best_index] == self.worst:
+                # a move still being searched might do better than a lost one
+                return None, moves[resolved.index(False)]
+            return scores[best_index], moves[best_index]
+
+        score, best_move = scores[best_index], moves[best_index]
+        if self.solver_cls is BooleanMinimax:
+            if score == self.best:
+                return True, best_move
+            return False, random.choice(moves)
+        return score, best_move
@@ -0,0 +1,167 @@
+import fcntl
+import os
+
+import numpy as np
+
+from solvers.transposition import EXACT, LOWER, UPPER, TTEntry, pack_entry, unpack_entry
+
+MAGIC = int.from_bytes(b'UTTTSTOR', 'little')
+VERSION = 2
+# magic, version, capacity, count as of the last flush
+HEADER_WORDS = 4
+# give up on a store after scanning this many slots
+MAX_PROBES = 64
+
+
+class SolvedStore:
+    '''
+    a persistent store of proven results kept in a file that is accessed through mmap
+    the file is an open-addressed hash table of two-word slots (key xor packed entry, packed entry)
+    with linear probing, so a lookup reads a couple of words and nothing is unpickled; the operating
+    system pages the file in on demand, so it can be larger than the memory
+    like SharedTranspositionTable, a reader only trusts a slot whose words xor back to its key, so
+    readers take no lock and a slot being written reads as a slot of another key; writers hold an
+    exclusive flock on the file, otherwise two of them could claim the same empty slot for
+    different keys and one of the results would be lost
+    results are (value, bound) pairs for the player to move: an exact win, draw or loss,
+    or a draw as a lower (at least draw) or upper (at most draw) bound.
+    The store has the interface of a transposition table and is passed to the solvers as tt
+    path: the file of the store, created when it does not exist
+    capacity: the number of slots of a new store, rounded up to a power of 2
+    '''
+
+    def __init__(self, path: str, capacity: int = 2**20) -> None:
+        self.path = path
+        if not os.path.exists(path):
+            capacity = 1 << max(capacity - 1, 1).bit_length()
+            words = np.memmap(path, dtype=np.uint64, mode='w+',
+                              shape=(HEADER_WORDS + 2*capacity,))
+            words[:HEADER_WORDS] = (MAGIC, VERSION, capacity, 0)
+            words.flush()
+            del words
+        self._map()
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def _map(self):
+        self.words = np.memmap(self.path, dtype=np.uint64, mode='r+')
+        # the lock of the writers, every open file description locks on its own
+        self.fd = os.open(self.path, os.O_RDWR)
+        magic, version, capacity, _ = (int(word) for word in self.words[:HEADER_WORDS])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{self.path} is not a solved position store of version {VERSION}')
+        self.capacity = capacity
+        self.header = self.words[:HEADER_WORDS]
+        self.slots = self.words[HEADER_WORDS:].reshape(capacity, 2)
+
+    def __getstate__(self):
+        # a pickled store reopens the same file in the receiving process
+        return {'path': self.path}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state['path'])
+
+    def __len__(self):
+        return len(self._filled())
+
+    def _filled(self):
+        '''
+        return the indices of the slots holding an entry within MAX_PROBES slots of the home of its key,
+        which leaves out the slots torn by concurrent writes
+        '''
+        indices = np.flatnonzero(self.slots[:, 1])
+        keys = self.slots[indices, 0] ^ self.slots[indices, 1]
+        distance = (indices.astype(np.uint64) - (keys & np.uint64(self.capacity - 1))) & np.uint64(self.capacity - 1)
+        return indices[distance < MAX_PROBES]
+
+    def _find(self, key: int):
+        '''
+        return the index of the slot holding the key or of the empty slot where it belongs,
+        None if neither is found within MAX_PROBES slots
+        '''
+        index = key & (self.capacity - 1)
+        for _ in range(MAX_PROBES):
+            data = int(self.slots[index, 1])
+            if data == 0 or int(self.slots[index, 0]) ^ data == key:  # 0 marks an empty slot
+                return index
+            self.collisions += 1
+            index = (index + 1) & (self.capacity - 1)
+        return None
+
+    def probe(self, key: int):
+        '''
+        return the entry stored for the key, None if there is none
+        '''
+        self.probes += 1
+        index = self._find(key)
+        if index is None:
+            return None
+        data = int(self.slots[index, 1])
+        if data == 0:
+            return None
+        self.hits += 1
+        return unpack_entry(data)
+
+    def store(self, key: int, value: int, bound: int, move: int = None, depth: int = 0):
+        '''
+        record a result, merging it with what is already known about the position
+        '''
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            index = self._find(key)
+            if index is None:  # the neighbourhood is full, drop the result
+                return
+            data = int(self.slots[index, 1])
+            if data != 0:
+                value, bound, move, depth = _merge(unpack_entry(data), TTEntry(value, bound, move, depth))
+            data = pack_entry(value, bound, move, depth)
+            self.slots[index, 1] = data
+            self.slots[index, 0] = key ^ data
+            self.stores += 1
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def items(self):
+        '''
+        iterate over the (key, entry) pairs of the store
+        '''
+        for index in self._filled():
+            data = int(self.slots[index, 1])
+            yield int(self.slots[index, 0]) ^ data, unpack_entry(data)
+
+    def stats(self):
+        '''
+        return the counters of the store as a dict
+        '''
+        return {'probes': self.probes, 'hits': self.hits, 'collisions': self.collisions,
+                'stores': self.stores, 'hit_rate': self.hits/self.probes if self.probes else 0.0,
+                'size': len(self), 'capacity': self.capacity}
+
+    def flush(self):
+        # the count is recomputed rather than kept up to date, which would race between writers
+        self.header[3] = len(self)
+        self.words.flush()
+
+    def close(self):
+        self.flush()
+        os.close(self.fd)
+        self.words = self.header = self.slots = None
+
+
+def _merge(old: TTEntry, new: TTEntry):
+    '''
+    return the entry combining the bounds of both entries
+    '''
+    lower = max(old.lower(), new.lower())
+    upper = min(old.upper(), new.upper())
+    # the move comes with the lower bound it achieves
+    move = new.move if new.lower() >= old.lower() else old.move
+    depth = min(old.depth, new.depth)
+    if lower == upper:
+        return TTEntry(lower, EXACT, move, depth)
+    elif lower > -1:
+        return TTEntry(lower, LOWER, move, depth)
+    else:
+        return TTEntry(upper, UPPER, move, depth)
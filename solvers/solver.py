@@ -0,0 +1,201 @@
+import resource
+from collections import Counter
+from dataclasses import dataclass, field
+from time import time
+
+
+class SearchAborted(Exception):
+    '''
+    raised inside a search that has been asked to stop
+    '''
+    pass
+
+
+class BudgetExhausted(SearchAborted):
+    '''
+    raised inside a search that has run out of time or nodes
+    '''
+    pass
+
+
+@dataclass
+class SearchStats:
+    '''
+    the work done by a search, filled in by the solver as it goes
+    nodes: the number of visited nodes
+    terminal_hits: the visited nodes where the game is over
+    cutoffs: the number of cutoffs keyed by the index of the move that caused them
+    tt_probes: the lookups in the transposition table
+    tt_hits: the lookups that found an entry
+    max_depth: the largest number of moves from the root to a visited node
+    elapsed: the seconds spent in the search
+    peak_memory: the peak resident memory of the process in bytes
+    proven: False when the budget ran out and the result is only the best found so far
+    '''
+    nodes: int = 0
+    terminal_hits: int = 0
+    cutoffs: Counter = field(default_factory=Counter)
+    tt_probes: int = 0
+    tt_hits: int = 0
+    max_depth: int = 0
+    elapsed: float = 0.0
+    peak_memory: int = 0
+    proven: bool = True
+    start: float = field(default_factory=time, repr=False)
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes/self.elapsed if self.elapsed > 0 else 0.0
+
+    def update_time(self):
+        self.elapsed = time() - self.start
+
+    def finish(self):
+        '''
+        record the elapsed time and the peak memory at the end of the search
+        '''
+        self.update_time()
+        # ru_maxrss is in kilobytes on linux
+        self.peak_memory = max(self.peak_memory, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024)
+
+    def merge(self, other, depth: int = 0):
+        '''
+        add the work of another search, e.g. of a worker process
+        depth: int -- the depth of the root of the other search in this one
+        '''
+        self.nodes += other.nodes
+        self.terminal_hits += other.terminal_hits
+        self.cutoffs.update(other.cutoffs)
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+        self.max_depth = max(self.max_depth, other.max_depth + depth)
+        self.peak_memory = max(self.peak_memory, other.peak_memory)
+
+    def summary(self):
+        '''
+        return the statistics as a line of text
+        '''
+        first = self.cutoffs[0]/sum(self.cutoffs.values()) if self.cutoffs else 0.0
+        hit_rate = self.tt_hits/self.tt_probes if self.tt_probes else 0.0
+        return (f'{self.nodes} nodes in {self.elapsed:.2f}s ({self.nodes_per_second:.0f} nodes/s), '
+                f'{self.terminal_hits} terminal, depth {self.max_depth}, '
+                f'{sum(self.cutoffs.values())} cutoffs ({first:.0%} on the first move), '
+                f'tt hit rate {hit_rate:.0%}, peak memory {self.peak_memory/2**20:.0f} MiB'
+                + ('' if self.proven else ', out of budget'))
+
+
+class Solver:
+    '''
+    base class to inherit
+    counts the work of the search in stats and lets another process stop the search through stop_event
+    progress: an optional function called with the stats every progress_interval seconds
+    deadline: the time.time() at which the search runs out of time
+    node_limit: the number of visited nodes at which the search runs out of nodes
+    '''
+    # number of visited nodes between two checks of the stop event and the progress timer
+    check_interval = 256
+
+    def __init__(self) -> None:
+        self.stats = SearchStats()
+        self.stop_event = None
+        self.progress = None
+        self.progress_interval = 1.0
+        self._last_progress = 0.0
+        self.deadline = None
+        self.node_limit = None
+        # the (result, move) to fall back on when the budget runs out
+        self.partial = None
+
+    @property
+    def nodes(self):
+        return self.stats.nodes
+
+    def _visit(self, depth: int = 0, terminal: bool = False):
+        '''
+        depth: int -- the number of moves from the root to the node
+        terminal: bool -- whether the game is over at the node
+        record a visited node, raise SearchAborted once the stop event is set
+        and BudgetExhausted once the deadline or the node limit is reached
+        '''
+        stats = self.stats
+        stats.nodes += 1
+        if terminal:
+            stats.terminal_hits += 1
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+        if self.node_limit is not None and stats.nodes >= self.node_limit:
+            raise BudgetExhausted
+        if stats.nodes % self.check_interval == 0:
+            if self.stop_event is not None and self.stop_event.is_set():
+                raise SearchAborted
+            if self.deadline is not None and time() >= self.deadline:
+                raise BudgetExhausted
+            if self.progress is not None:
+                stats.update_time()
+                if stats.elapsed - self._last_progress >= self.progress_interval:
+                    self._last_progress = stats.elapsed
+                    self.progress(stats)
+
+    def _out_of_budget(self):
+        '''
+        return whether the deadline or the node limit has been reached
+        '''
+        if self.deadline is not None and time() >= self.deadline:
+            return True
+        return self.node_limit is not None and self.stats.nodes >= self.node_limit
+
+    def _probe_table(self, key: int):
+        '''
+        return the entry of the transposition table for the key, None if there is none
+        '''
+        self.stats.tt_probes += 1
+        entry = self.tt.probe(key)
+        if entry is not None:
+            self.stats.tt_hits += 1
+        return entry
+
+    def _cutoff(self, index: int):
+        '''
+        record that the move at the index made the remaining moves irrelevant
+        '''
+        self.stats.cutoffs[index] += 1
+
+    def _best_effort(self):
+        '''
+        undo the moves of the interrupted search
+        return the (result, move) found so far, the result is None when nothing is known
+        '''
+        while len(self.game.history) > self.root_depth:
+            self.game.undo()
+        if self.partial is not None:
+            return self.partial
+        return None, self.game.next_valid_moves[0]
+
+    def run(self):
+        raise NotImplementedError
+
+    def solve(self, progress=None, progress_interval: float = 1.0, time_limit: float = None,
+              node_limit: int = None):
+        '''
+        run the search with fresh statistics
+        progress: an optional function called with the stats every progress_interval seconds
+        time_limit: float -- the number of seconds the search may take
+        node_limit: int -- the number of nodes the search may visit
+        once the budget runs out, the search stops with the best result found so far
+        and stats.proven is False
+        return (result, best move, stats)
+        '''
+        self.stats = SearchStats()
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self._last_progress = 0.0
+        self.deadline = None if time_limit is None else self.stats.start + time_limit
+        self.node_limit = node_limit
+        self.partial = None
+        try:
+            result, move = self.run()
+        except BudgetExhausted:
+            self.stats.proven = False
+            result, move = self._best_effort()
+        self.stats.finish()
+        return result, move, self.stats
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import time
+
+import numpy as np
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+
+from solvers.alpha_beta import AlphaBeta
+from solvers.solved_store import SolvedStore
+
+
+def open_empty_cells(inner_board: np.ndarray, outer_board: np.ndarray):
+    '''
+    return the number of empty slots in the sub-boards that are still open
+    '''
+    # blocks[outer_row, outer_col] holds the 3x3 sub-board
+    blocks = inner_board.reshape(3, 3, 3, 3).swapaxes(1, 2)
+    return int(np.sum((blocks == EMPTY) & (outer_board == INCOMPLETE)[:, :, None, None]))
+
+
+def sample_line(max_empty: int, seed: str):
+    '''
+    play a random game from the start
+    return the unfinished states along it with at most max_empty open empty slots, deepest first
+    '''
+    rng = random.Random(seed)
+    game = UltimateTTT(None, None)
+    states = []
+    while game.outcome == INCOMPLETE:
+        if open_empty_cells(game.inner_board, game.outer_board) <= max_empty:
+            states.append(game.get_state())
+        game.update_state(rng.choice(game.next_valid_moves))
+    return states[::-1]
+
+
+def shard_path(path: str, shard: int):
+    return f'{path}.shard{shard}'
+
+
+def work_path(path: str):
+    return f'{path}.work'
+
+
+def _build_shard(path: str, shard: int, shards: int, num_games: int, max_empty: int, seed: int):
+    '''
+    solve the lines of the games assigned to the shard into the store shared by the shards,
+    so every shard reuses the proofs of the others
+    the number of finished games of the shard is saved after every game,
+    so an interrupted shard resumes where it stopped
+    return the (number of positions solved, seconds spent)
+    '''
+    store = SolvedStore(work_path(path))
+    progress_path = shard_path(path, shard) + '.progress'
+    done = 0
+    if os.path.exists(progress_path):
+        with open(progress_path) as f:
+            done = json.load(f)['games']
+
+    positions = 0
+    start = time()
+    for game_index in range(shard + done*shards, num_games, shards):
+        # the deepest positions come first so the earlier ones reuse their proofs
+        for state in sample_line(max_empty, f'{seed}-{game_index}'):
+            AlphaBeta(state, tt=store).run()
+            positions += 1
+        done += 1
+        store.flush()
+        with open(progress_path, 'w') as f:
+            json.dump({'games': done}, f)
+    store.close()
+    return positions, time() - start
+
+
+def merge_stores(paths: list, path: str):
+    '''
+    merge the stores into a new store sized to hold them all
+    '''
+    stores = [SolvedStore(store_path) for store_path in paths]
+    if os.path.exists(path):
+        os.remove(path)
+    # keep the table at most half full
+    merged = SolvedStore(path, capacity=2*max(sum(len(store) for store in stores), 1))
+    for store in stores:
+        for key, entry in store.items():
+            merged.store(key, *entry)
+        store.close()
+    merged.close()
+
+
+def build_tablebase(path: str, max_empty: int = 12, num_games: int = 1000, workers: int = 4,
+                    seed: int = 0, capacity: int = 2**20, verbose: bool = False):
+    '''
+    path: str -- the file of the tablebase
+    max_empty: int -- the largest number of empty slots in open sub-boards of a stored position
+    num_games: int -- the number of random games whose late-game positions are solved
+    workers: int -- the number of shards, each solved by its own process
+    capacity: int -- the number of slots per shard of the store shared by the shards
+    sample the late-game positions of random games and solve them bottom-up with AlphaBeta,
+    every proof is kept in a store shared by the shards, which is then merged into a tablebase
+    sized to its entries
+    an interrupted build is resumed by calling it again with the same arguments
+    return the number of positions solved per second
+    '''
+    positions = 0
+    start = time()
+    # created before the shards start, which would race to create it
+    SolvedStore(work_path(path), capacity*workers).close()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_build_shard, path, shard, workers, num_games,
+                                   max_empty, seed): shard for shard in range(workers)}
+        for future in as_completed(futures):
+            shard_positions, shard_seconds = future.result()
+            positions += shard_positions
+            if verbose:
+                print(f'shard {futures[future]}: {shard_positions} positions in {shard_seconds:.1f}s '
+                      f'({shard_positions/max(shard_seconds, 1e-9):.1f} positions/s)')
+    elapsed = time() - start
+
+    merge_stores([work_path(path)], path)
+    rate = positions/max(elapsed, 1e-9)
+    if verbose:
+        tablebase = SolvedStore(path)
+        print(f'{positions} positions solved in {elapsed:.1f}s ({rate:.1f} positions/s), '
+              f'{len(tablebase)} entries in {path}')
+        tablebase.close()
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='build an endgame tablebase')
+    parser.add_argument('path')
+    parser.add_argument('--max-empty', type=int, default=12)
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    build_tablebase(args.path, args.max_empty, args.games, args.workers, args.seed, verbose=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# bound types of a stored value, always with respect to the player to move
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+NO_MOVE = 127
+
+
+class TTEntry(namedtuple('TTEntry', ['value', 'bound', 'move', 'depth'])):
+    def lower(self):
+        '''
+        return the lower bound of the value for the player to move
+        '''
+        return -1 if self.bound == UPPER else self.value
+
+    def upper(self):
+        '''
+        return the upper bound of the value for the player to move
+        '''
+        return 1 if self.bound == LOWER else self.value
+
+    def is_exact(self):
+        return self.lower() == self.upper()
+
+
+def decide(entry: TTEntry, threshold: int, root_to_move: bool):
+    '''
+    entry: TTEntry -- the entry of a position
+    threshold: int -- 0 when seeking at least a draw for the root player, 1 when seeking a win
+    root_to_move: bool -- whether the root player is the player to move in the position
+    return True if the root player reaches the threshold, False if not, None if the entry cannot tell
+    '''
+    if root_to_move:
+        lower, upper = entry.lower(), entry.upper()
+    else:
+        lower, upper = -entry.upper(), -entry.lower()
+    if lower >= threshold:
+        return True
+    if upper < threshold:
+        return False
+    return None
+
+
+def bound_of(result: bool, threshold: int, root_to_move: bool):
+    '''
+    the inverse of decide
+    return the (value, bound) for the player to move that records the result for the root player
+    '''
+    if root_to_move:
+        return (threshold, LOWER) if result else (threshold - 1, UPPER)
+    else:
+        return (-threshold, UPPER) if result else (1 - threshold, LOWER)
+
+
+class TranspositionTable:
+    '''
+    a transposition table local to the process, backed by a dict
+    '''
+
+    def __init__(self) -> None:
+        self.table = {}
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def probe(self, key: int):
+        '''
+        return the entry stored for the key, None if there is none
+        '''
+        self.probes += 1
+        entry = self.table.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def store(self, key: int, value: int, bound: int, move: int = None, depth: int = 0):
+        self.stores += 1
+        self.table[key] = TTEntry(value, bound, move, depth)
+
+    def stats(self):
+        '''
+        return the counters of the table as a dict
+        '''
+        return {'probes': self.probes, 'hits': self.hits, 'collisions': self.collisions,
+                'stores': self.stores, 'hit_rate': self.hits/self.probes if self.probes else 0.0}
+
+    def clear(self):
+        self.table.clear()
+
+
+def pack_entry(value: int, bound: int, move: int, depth: int):
+    '''
+    pack an entry into a non-zero integer:
+    bit 0 marks a used slot, bits 1-2 hold value + 1, bits 3-4 the bound,
+    bits 5-11 the move and bits 12-19 the depth
+    '''
+    move = NO_MOVE if move is None else move
+    return 1 | (value + 1) << 1 | bound << 3 | move << 5 | depth << 12
+
+
+def unpack_entry(data: int):
+    move = (data >> 5) & 0x7f
+    return TTEntry(value=((data >> 1) & 0x3) - 1, bound=(data >> 3) & 0x3,
+                   move=None if move == NO_MOVE else move, depth=(data >> 12) & 0xff)
+
+
+class SharedTranspositionTable:
+    '''
+    a fixed-size transposition table in shared memory that processes attach to by name
+    every slot is a pair of 64-bit words (key xor data, data): a reader only trusts a slot
+    whose words xor back to its key, so a write torn by another process reads as a miss and
+    no lock is needed. A store always replaces the slot. The counters live in the shared
+    block as well and are approximate when several processes update them at once
+    size: the number of slots, rounded up to a power of 2
+    name: attach to the existing table with this name instead of creating a new one
+    '''
+    # probes, hits, collisions, stores
+    num_counters = 4
+
+    def __init__(self, size: int = 2**20, name: str = None) -> None:
+        size = 1 << max(size - 1, 1).bit_length()
+        nbytes = (self.num_counters + 2*size)*8
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.size = size
+        self._map()
+        if self.owner:
+            self.words[:] = 0
+
+    def _map(self):
+        self.words = np.ndarray((self.num_counters + 2*self.size,), dtype=np.uint64,
+                                buffer=self.shm.buf)
+        self.counters = self.words[:self.num_counters]
+        self.slots = self.words[self.num_counters:].reshape(self.size, 2)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __getstate__(self):
+        # a pickled table attaches to the same block in the receiving process
+        return {'name': self.shm.name, 'size': self.size}
+
+    def __setstate__(self, state: dict):
+        self.shm = shared_memory.SharedMemory(name=state['name'])
+        self.owner = False
+        self.size = state['size']
+        self._map()
+
+    def probe(self, key: int):
+        '''
+        return the entry stored for the key, None if there is none
+        '''
+        self.counters[0] += 1
+        slot = self.slots[key & (self.size - 1)]
+        data = int(slot[1])
+        if data == 0:
+            return None
+        if int(slot[0]) ^ data != key:
+            self.counters[2] += 1
+            return None
+        self.counters[1] += 1
+        return unpack_entry(data)
+
+    def store(self, key: int, value: int, bound: int, move: int = None, depth: int = 0):
+        data = pack_entry(value, bound, move, depth)
+        slot = self.slots[key & (self.size - 1)]
+        slot[1] = data
+        slot[0] = key ^ data
+        self.counters[3] += 1
+
+    def stats(self):
+        '''
+        return the counters of the table as a dict
+        '''
+        probes, hits, collisions, stores = (int(count) for count in self.counters)
+        return {'probes': probes, 'hits': hits, 'collisions': collisions,
+                'stores': stores, 'hit_rate': hits/probes if probes else 0.0}
+
+    def clear(self):
+        self.words[:] = 0
+
+    def close(self):
+        '''
+        detach from the table, the process that created it also frees it
+        '''
+        self.words = self.counters = self.slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def new_table(workers: int = 1):
+    '''
+    return a transposition table for the searches of a player with the workers,
+    a SharedTranspositionTable when they run in several processes, else a TranspositionTable
+    '''
+    return SharedTranspositionTable() if workers > 1 else TranspositionTable()
+
+
+def renew_table(tt):
+    '''
+    return an empty table of the same kind as tt, a SharedTranspositionTable is freed
+    '''
+    if isinstance(tt, SharedTranspositionTable):
+        tt.close()
+        return SharedTranspositionTable(tt.size)
+    return TranspositionTable()
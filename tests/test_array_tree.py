@@ -0,0 +1,201 @@
+import random
+
+import numpy as np
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from mcts.array_tree import LOSS, NO_CHILD, ArrayTree
+from mcts.core import MCTS
+from players.random_player import RandomPlayer
+from solvers.alpha_beta import AlphaBeta
+from utils.eval_utils import (INNER_WEIGHT, OUTER_WEIGHT, SCALE, WON_WEIGHT, count_threats, static_value,
+                              static_values)
+from utils.hash_utils import hash_state
+from utils.test_utils import generate_random_game
+
+
+def test_statistics(num_simulation=300):
+    random.seed(0)
+    tree = ArrayTree(UltimateTTT(None, None).get_state(), RandomPlayer(), 1.4, capacity=16)
+    for _ in range(num_simulation):
+        tree.simulate()
+    moves, visits = tree.get_distribution()
+    assert sorted(moves) == list(range(81)) and visits.sum() == num_simulation
+    # a node is visited once when it is added and then once more through one of its children
+    for node in range(1, len(tree)):
+        children = tree.children(node)
+        if children.stop > 0:
+            assert tree.visits[children].sum() == tree.node_visits[node] - 1
+    assert np.all(np.abs(tree.value_sum[:tree.num_edges]) <= tree.visits[:tree.num_edges])
+
+
+def test_select_breaks_ties(num_selection=500):
+    random.seed(0)
+    tree = ArrayTree(UltimateTTT(None, None).get_state(), RandomPlayer(), 1.4)
+    tree.expand(tree.root, tree.game.next_valid_moves)
+    children = tree.children(tree.root)
+    # unvisited edges come first and are all picked
+    assert {tree.select(tree.root) for _ in range(num_selection)} == set(range(children.start, children.stop))
+    # so are edges with the same score, except the one proven to lose
+    tree.visits[children] = 1
+    game = tree.game.copy()
+    game.update_state(int(tree.move[children.start]))
+    tree.child[children.start] = tree._new_node(tree.root, game)
+    tree.proof[tree.child[children.start]] = LOSS
+    assert {tree.select(tree.root) for _ in range(num_selection)} == set(range(children.start + 1, children.stop))
+
+
+def test_finds_win(num_simulation=500):
+    random.seed(0)
+    np.random.seed(0)
+    # the only winning move of the position is 15
+    tree = ArrayTree(generate_random_game(50, 0), RandomPlayer(), 1.4)
+    for _ in range(num_simulation):
+        tree.simulate()
+    moves, visits = tree.get_distribution()
+    assert moves[np.argmax(visits)] == 15
+
+
+def test_truncate_keeps_subtree(num_simulation=200):
+    random.seed(0)
+    np.random.seed(0)
+    state = generate_random_game(20, 0)
+    mcts = MCTS(state, RandomPlayer(), 1.4)
+    mcts.run_simulation(num_simulation)
+    game = UltimateTTT(None, None, state)
+    game.update_state(mcts.move_and_truncate())
+    kept = mcts.tree.root
+    reply = mcts.tree.move[mcts.tree.children(kept)][0]
+    game.update_state(int(reply))
+    mcts.truncate(game.get_state())
+    assert mcts.tree.parent[mcts.tree.root] == kept
+
+    # a state with a valid previous move but another position starts a new tree
+    game.update_state(int(mcts.tree.move[mcts.tree.children(mcts.tree.root)][0]))
+    state = game.get_state()
+    state['inner_board'].flat[np.flatnonzero(state['inner_board'] == EMPTY)[0]] = -state['current_player']
+    mcts.truncate(state)
+    assert mcts.tree.root == 0 and len(mcts.tree) == 1 and mcts.tree.game.get_hash() == hash_state(state)
+
+    # so does a state not reached from the root
+    mcts.truncate(generate_random_game(30, 1))
+    assert mcts.tree.root == 0 and len(mcts.tree) == 1
+
+
+def test_solver(num_simulation=5000):
+    random.seed(0)
+    np.random.seed(0)
+    for num_steps, seed in [(50, 0), (55, 2), (60, 2)]:
+        state = generate_random_game(num_steps, seed)
+        mcts = MCTS(state, RandomPlayer(), 1.4)
+        mcts.run_simulation(num_simulation)
+        # the simulations stop once the root is solved
+        assert mcts.tree.is_solved() and mcts.tree.visits[mcts.tree.children(mcts.tree.root)].sum() < num_simulation
+        value, _ = AlphaBeta(state).run()
+        player = state['current_player']
+        assert mcts.tree.root_outcome() == {1: player, 0: TIE, -1: -player}[value]
+
+        move = mcts.move_and_truncate()
+        game = UltimateTTT(None, None, state)
+        game.update_state(move)
+        assert AlphaBeta(game.get_state()).run()[0] == -value
+
+
+def test_transpositions(num_simulation=1000):
+    random.seed(0)
+    np.random.seed(0)
+    tree = ArrayTree(generate_random_game(40, 1), RandomPlayer(), 1.4, transpositions=True)
+    for _ in range(num_simulation):
+        tree.simulate()
+    assert tree.shared > 0 and len(tree.table) == len(tree)
+    assert tree.get_distribution()[1].sum() == num_simulation
+    # a shared node is visited through every edge reaching it
+    edges = np.flatnonzero(tree.child[:tree.num_edges] != NO_CHILD)
+    in_visits = np.bincount(tree.child[edges], weights=tree.visits[edges], minlength=len(tree))
+    assert np.array_equal(in_visits[1:], tree.node_visits[1:len(tree)])
+
+    # the solver still agrees with alpha-beta on the DAG
+    state = generate_random_game(55, 2)
+    mcts = MCTS(state, RandomPlayer(), 1.4, transpositions=True)
+    mcts.run_simulation(5000)
+    value, _ = AlphaBeta(state).run()
+    player = state['current_player']
+    assert mcts.tree.root_outcome() == {1: player, 0: TIE, -1: -player}[value]
+
+
+def test_rave(num_simulation=500):
+    random.seed(0)
+    np.random.seed(0)
+    tree = ArrayTree(generate_random_game(50, 0), RandomPlayer(), 1.4, rave=300)
+    for _ in range(num_simulation):
+        tree.simulate()
+    moves, visits = tree.get_distribution()
+    assert moves[np.argmax(visits)] == 15
+    # a move is played as first every time its edge is visited
+    edges = slice(0, tree.num_edges)
+    assert np.all(tree.amaf_visits[edges] >= tree.visits[edges])
+    assert np.all(np.abs(tree.amaf_value_sum[edges]) <= tree.amaf_visits[edges])
+
+
+def test_static_evaluation(num_games=20):
+    for seed in range(num_games):
+        state = generate_random_game(40, seed)
+        game = UltimateTTT(None, None, state)
+        x_inner, x_outer = count_threats(game.inner_board, game.outer_board, X)
+        o_inner, o_outer = count_threats(game.inner_board, game.outer_board, O)
+        won = np.sum(game.outer_board == X) - np.sum(game.outer_board == O)
+        score = WON_WEIGHT*won + OUTER_WEIGHT*(x_outer - o_outer) + INNER_WEIGHT*(x_inner - o_inner)
+        value = static_values(game.inner_board.reshape(1, 81), game.outer_board.reshape(1, 9))[0]
+        assert np.isclose(value, np.tanh(SCALE*score))
+        assert np.isclose(static_value(state), value*state['current_player'])
+
+
+def test_cutoff(cutoff=8, num_simulation=300):
+    random.seed(0)
+    np.random.seed(0)
+    state = generate_random_game(20, 0)
+    for kwargs in ({}, {'evaluator': static_value}, {'batch_size': 8}, {'batch_size': 8, 'batch_leaves': True}):
+        mcts = MCTS(state, RandomPlayer(), 1.4, cutoff=cutoff, **kwargs)
+        assert np.isclose(sum(mcts.run_simulation(num_simulation)), 1)
+        assert 0 < mcts.stats.roll_out_length <= cutoff
+        tree = mcts.tree
+        edges = slice(0, tree.num_edges)
+        assert np.all(np.abs(tree.value_sum[edges]) <= tree.visits[edges])
+
+
+def test_node_budget(max_nodes=300, num_simulation=400):
+    random.seed(0)
+    np.random.seed(0)
+    state = generate_random_game(20, 0)
+    mcts = MCTS(state, RandomPlayer(), 1.4, max_nodes=max_nodes)
+    game = UltimateTTT(None, None, state)
+    for _ in range(4):
+        mcts.run_simulation(num_simulation)
+        tree = mcts.tree
+        assert len(tree) <= max_nodes and len(tree.parent) == max_nodes
+        assert tree.get_distribution()[1].sum() >= num_simulation
+
+        # the statistics of the kept subtree survive the reclamation of the rest
+        move = mcts.move_and_truncate()
+        game.update_state(move)
+        assert tree.root == 0 and tree.parent[0] == NO_CHILD
+        edge = tree.children(0).start + np.argmax(tree.visits[tree.children(0)])
+        # the arrays are compacted in place, so the statistics of the reply are copied
+        moves, visits = tree.move[tree.children(tree.child[edge])].copy(), tree.visits[tree.children(tree.child[edge])].copy()
+        game.update_state(int(tree.move[edge]))
+        mcts.truncate(game.get_state())
+        assert np.array_equal(tree.get_distribution()[0], moves)
+        assert np.array_equal(tree.get_distribution()[1], visits)
+        assert len(tree) == np.count_nonzero(tree.child[:tree.num_edges] != NO_CHILD) + 1
+
+
+if __name__ == '__main__':
+    test_statistics()
+    test_select_breaks_ties()
+    test_finds_win()
+    test_truncate_keeps_subtree()
+    test_solver()
+    test_transpositions()
+    test_rave()
+    test_static_evaluation()
+    test_cutoff()
+    test_node_budget()
@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+from alphazero.core import ValueHeadEvaluator
+from alphazero.model import create_model, init_model
+from env.batched import RECENT, BatchedGames
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from mcts.core import MCTS
+from players.random_player import RandomPlayer
+from utils.test_utils import generate_random_game
+
+
+def test_batched_games(num_batches=10, batch_size=5):
+    for seed in range(num_batches):
+        random.seed(seed)
+        games = [generate_random_game(index*10, seed*batch_size + index) for index in range(batch_size)]
+        games = [UltimateTTT(None, None, state) for state in games]
+        batch = BatchedGames(games)
+        # play the same random moves in the games and in the batch
+        while True:
+            for index, game in enumerate(games):
+                assert batch.outcome[index] == game.outcome
+                assert np.array_equal(batch.inner[index], game.inner_board.reshape(81))
+                assert np.array_equal(batch.outer[index], game.outer_board.reshape(9))
+            active = np.flatnonzero(batch.outcome == INCOMPLETE)
+            if len(active) == 0:
+                break
+            moves = []
+            for valid, index in zip(batch.valid_moves(active), active):
+                game = games[index]
+                assert tuple(np.flatnonzero(valid)) == game.next_valid_moves
+                moves.append(random.choice(game.next_valid_moves))
+                game.update_state(moves[-1])
+            batch.step(active, np.array(moves))
+
+
+def test_random_play_out():
+    np.random.seed(0)
+    game = UltimateTTT(None, None, generate_random_game(30, 0))
+    outcomes = BatchedGames([game]*64).random_play_out()
+    assert set(outcomes) <= {X_WIN, O_WIN, TIE} and len(set(outcomes)) > 1
+    assert game.outcome == INCOMPLETE
+
+
+def test_get_states(plies=5):
+    random.seed(0)
+    np.random.seed(0)
+    games = [UltimateTTT(None, None, generate_random_game(rollout_num, 0)) for rollout_num in (0, 3, 20)]
+    batch = BatchedGames(games)
+    active = np.arange(len(games))
+    for _ in range(plies):
+        valid = batch.valid_moves(active)
+        moves = np.array([random.choice(np.flatnonzero(row)) for row in valid])
+        batch.step(active, moves)
+        for game, move in zip(games, moves):
+            game.update_state(int(move))
+
+    for game, state in zip(games, batch.get_states(active)):
+        assert np.array_equal(state['inner_board'], game.inner_board)
+        assert state['current_player'] == game.current_player and state['previous_move'] == game.previous_move
+        assert [move for _, move in state['history']] == [move for _, move in game.history[-RECENT:]]
+
+    # the network sees the same history through the batch as through the game
+    evaluator = ValueHeadEvaluator(*init_model(create_model(True)))
+    values = evaluator.batch(batch.get_states(active))
+    assert np.allclose(values, evaluator.batch([game.get_state() for game in games]), atol=1e-5)
+
+
+def test_batched_mcts(num_simulation=60):
+    random.seed(0)
+    np.random.seed(0)
+    state = generate_random_game(20, 0)
+    for batch_leaves in (False, True):
+        mcts = MCTS(state, RandomPlayer(), 1.4, batch_size=8, batch_leaves=batch_leaves)
+        assert np.isclose(sum(mcts.run_simulation(num_simulation)), 1)
+        tree = mcts.tree
+        assert mcts.get_distribution()[1].sum() == num_simulation
+        assert np.all(np.abs(tree.value_sum[:tree.num_edges]) <= tree.visits[:tree.num_edges])
+        mcts.move_and_truncate()
+
+
+def test_parallel_evaluator(num_simulation=24, workers=2):
+    random.seed(0)
+    np.random.seed(0)
+    state = generate_random_game(20, 0)
+    evaluator = ValueHeadEvaluator(*init_model(create_model(True)))
+    for parallel in ('root', 'tree'):
+        # the network has been run in this process, the workers rebuild it from its parameters
+        mcts = MCTS(state, RandomPlayer(), 1.4, workers=workers, parallel=parallel, cutoff=4, evaluator=evaluator)
+        assert np.isclose(sum(mcts.run_simulation(num_simulation)), 1)
+        assert mcts.get_distribution()[1].sum() == num_simulation
+        mcts.close()
+
+
+if __name__ == '__main__':
+    test_batched_games()
+    test_random_play_out()
+    test_get_states()
+    test_batched_mcts()
+    test_parallel_evaluator()
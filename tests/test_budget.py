@@ -0,0 +1,70 @@
+from time import time
+
+from env.ultimate_ttt import UltimateTTT
+from mcts.core import MCTS
+from players.alpha_beta_player import AlphaBetaPlayer
+from players.mcts_player import MCTSPlayer
+from players.pns_player import PNSPlayer
+from players.random_player import RandomPlayer
+from solvers.alpha_beta import AlphaBeta
+from solvers.boolean_minimax import BooleanMinimax
+from solvers.negamax import NegaMax
+from solvers.pns import PNS
+from solvers.transposition import TranspositionTable
+from utils.test_utils import generate_random_game
+
+
+def test_node_limit(rollout_num=45, seed=1, node_limit=1000):
+    random_state = generate_random_game(rollout_num, seed)
+    valid_moves = UltimateTTT(None, None, random_state).next_valid_moves
+    solvers = [lambda tt: NegaMax(random_state, tt=tt), lambda tt: AlphaBeta(random_state, tt=tt),
+               lambda tt: BooleanMinimax(random_state, False, tt=tt), lambda tt: PNS(random_state, False, tt=tt)]
+    for create_solver in solvers:
+        tt = TranspositionTable()
+        _, move, stats = create_solver(tt).solve(node_limit=node_limit)
+        assert not stats.proven and stats.nodes == node_limit
+        assert move in valid_moves
+
+    # an interrupted search leaves the table consistent
+    for create_solver in solvers[1:]:
+        tt = TranspositionTable()
+        create_solver(tt).solve(node_limit=node_limit)
+        result, move, stats = create_solver(tt).solve()
+        assert stats.proven and (result, move) == create_solver(None).run()
+
+
+def test_time_limit(rollout_num=45, seed=1, time_limit=0.5):
+    random_state = generate_random_game(rollout_num, seed)
+    valid_moves = UltimateTTT(None, None, random_state).next_valid_moves
+    for player in (AlphaBetaPlayer(time_limit=time_limit), PNSPlayer(time_limit=time_limit)):
+        start = time()
+        assert player.move(random_state) in valid_moves
+        assert time() - start < 2*time_limit
+
+
+def test_mcts_time_limit(time_limit=0.5):
+    state = UltimateTTT(None, None).get_state()
+    mcts = MCTS(state, RandomPlayer(), 1.4)
+    mcts.run_simulation(None, time_limit)
+    stats = mcts.stats
+    assert time_limit <= stats.elapsed < 2*time_limit
+    assert stats.simulations == mcts.tree.get_distribution()[1].sum() == stats.roll_outs
+    assert stats.simulations_per_second > 0 and stats.roll_out_length > 0
+
+    # the number of simulations stays within its bounds whatever the time limit
+    mcts = MCTS(state, RandomPlayer(), 1.4)
+    mcts.run_simulation(50, time_limit=0., min_simulation=20)
+    assert 20 <= mcts.stats.simulations < 50
+    mcts.run_simulation(20, time_limit=60.)
+    assert mcts.stats.simulations == 20
+
+    player = MCTSPlayer(num_simulation=None, time_limit=time_limit, verbose=True)
+    start = time()
+    assert player.move(state) in range(81)
+    assert time() - start < 2*time_limit
+
+
+if __name__ == '__main__':
+    test_node_limit()
+    test_time_limit()
+    test_mcts_time_limit()
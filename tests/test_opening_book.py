@@ -0,0 +1,44 @@
+from env.ultimate_ttt import UltimateTTT
+from mcts.opening_book import OpeningBook, build_book, pack_move, unpack_move
+from players.alpha_beta_player import AlphaBetaPlayer
+from players.mcts_player import MCTSPlayer
+from players.pns_player import PNSPlayer
+
+
+def test_pack_move():
+    for move, visits, total_value in [(0, 1, -1), (80, 1000, 250), (40, 7, 7), (3, 0, 0)]:
+        book_move = unpack_move(pack_move(move, visits, total_value))
+        assert book_move.move == move and book_move.visits == visits
+        assert book_move.value == (total_value/visits if visits else 0.0)
+
+
+def test_opening_book(tmp_path, plies=2, num_simulation=200, top_k=2):
+    path = str(tmp_path / 'opening.book')
+    assert build_book(path, plies, num_simulation, top_k) == 1 + top_k
+
+    book = OpeningBook(path)
+    game = UltimateTTT(None, None)
+    moves = book.probe(game.get_state())
+    assert len(moves) == top_k
+    assert moves[0].visits >= moves[1].visits and sum(move.visits for move in moves) <= num_simulation
+    assert all(-1 <= move.value <= 1 for move in moves)
+
+    # every player answers from the book without searching the opening
+    state = game.get_state()
+    for player in [AlphaBetaPlayer(book=book), PNSPlayer(book=book), MCTSPlayer(book=book)]:
+        assert player.move(state) == moves[0].move
+
+    # the lines of the book moves are in the book, the others are not
+    game.update_state(moves[1].move)
+    assert book.best_move(game.get_state()) in game.next_valid_moves
+    game.update_state(game.next_valid_moves[0])
+    assert book.probe(game.get_state()) is None
+    book.close()
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_pack_move()
+    with tempfile.TemporaryDirectory() as directory:
+        test_opening_book(pathlib.Path(directory))
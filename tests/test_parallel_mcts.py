@@ -0,0 +1,108 @@
+import random
+import time
+
+import numpy as np
+from env.ultimate_ttt import UltimateTTT
+from mcts.core import MCTS
+from players.mcts_player import MCTSPlayer
+from players.random_player import RandomPlayer
+from utils.test_utils import generate_random_game
+
+
+def test_root_parallel(num_simulation=120, workers=3):
+    random.seed(0)
+    np.random.seed(0)
+    state = generate_random_game(20, 0)
+    mcts = MCTS(state, RandomPlayer(), 1.4, workers=workers)
+    assert sum(mcts.run_simulation(num_simulation)) == 1
+    moves, visits = mcts.get_distribution()
+    assert visits.sum() == num_simulation
+    assert set(moves) <= set(UltimateTTT(None, None, state).next_valid_moves)
+    # the main tree took its share of the simulations
+    assert mcts.tree.get_distribution()[1].sum() == num_simulation//workers
+
+    # the trees of the workers follow the moves and keep their subtrees
+    game = UltimateTTT(None, None, state)
+    game.update_state(mcts.move_and_truncate())
+    game.update_state(game.next_valid_moves[0])
+    mcts.truncate(game.get_state())
+    mcts.run_simulation(num_simulation)
+    assert mcts.get_distribution()[1].sum() >= num_simulation
+    mcts.close()
+    assert not mcts.processes
+
+
+def test_tree_parallel(num_simulation=120, workers=3):
+    random.seed(0)
+    np.random.seed(0)
+    state = generate_random_game(20, 0)
+    mcts = MCTS(state, RandomPlayer(), 1.4, workers=workers, parallel='tree', virtual_loss=2)
+    assert sum(mcts.run_simulation(num_simulation)) == 1
+    tree = mcts.tree
+    assert mcts.get_distribution()[1].sum() == num_simulation
+    # every virtual loss has been taken back
+    for node in range(1, len(tree)):
+        children = tree.children(node)
+        if children.stop > 0:
+            assert tree.visits[children].sum() == tree.node_visits[node] - 1
+    assert np.all(np.abs(tree.value_sum[:tree.num_edges]) <= tree.visits[:tree.num_edges])
+    mcts.close()
+
+
+def test_virtual_loss():
+    random.seed(0)
+    tree = MCTS(generate_random_game(20, 0), RandomPlayer(), 1.4).tree
+    for _ in range(50):
+        tree.simulate()
+    # the pending paths diverge at the root once the best move carries a virtual loss
+    first, _, _ = tree.select_leaf(virtual_loss=10)
+    second, _, _ = tree.select_leaf(virtual_loss=10)
+    assert first[0] != second[0]
+
+
+def test_player_workers():
+    for parallel in ('root', 'tree'):
+        player = MCTSPlayer(num_simulation=30, workers=2, parallel=parallel)
+        game = UltimateTTT(player, RandomPlayer())
+        game.play()
+        player.reset()
+        assert player.mcts_agent is None
+
+
+def test_ponder(num_simulation=30):
+    random.seed(0)
+    np.random.seed(0)
+    player = MCTSPlayer(num_simulation=num_simulation, ponder=True)
+    game = UltimateTTT(None, None, generate_random_game(20, 0))
+    game.update_state(player.move(game.get_state()))
+    mcts = player.mcts_agent
+    assert mcts.ponder_thread.is_alive()
+    time.sleep(0.5)
+    # the search goes on in the background until the reply arrives
+    assert mcts.pondered > 0
+    game.update_state(random.choice(game.next_valid_moves))
+    game.update_state(player.move(game.get_state()))
+    assert mcts.ponder_thread.is_alive()
+    assert mcts.tree.game.get_hash() == game.get_hash()
+
+    # a search in the foreground stops pondering instead of running alongside it
+    pondering = mcts.ponder_thread
+    mcts.run_simulation(num_simulation)
+    assert not pondering.is_alive() and mcts.ponder_thread is None
+    assert mcts.stop_pondering() == 0
+
+    # both sides pondering in one game
+    player.reset()
+    game = UltimateTTT(player, MCTSPlayer(num_simulation=num_simulation, ponder=True), generate_random_game(40, 0))
+    game.play()
+    for side in (game.player_x, game.player_o):
+        side.reset()
+        assert side.mcts_agent is None
+
+
+if __name__ == '__main__':
+    test_root_parallel()
+    test_tree_parallel()
+    test_virtual_loss()
+    test_player_workers()
+    test_ponder()
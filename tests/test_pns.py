@@ -0,0 +1,105 @@
+import pickle
+
+import numpy as np
+from alphazero.model import create_model, init_model
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from solvers.neural_pns import NeuralInitializer
+from solvers.parallel_pns import ParallelPNS
+from solvers.pns import PNS
+from solvers.pns_init import MobilityInitializer, ThreatInitializer, ValueInitializer, value_to_numbers
+from utils.eval_utils import static_value
+from utils.test_utils import generate_random_game
+
+# unfinished positions with a win, a draw and a loss for the player to move
+POSITIONS = [(55, 2), (55, 0), (60, 6)]
+
+
+def test_parallel_pns(workers=2, job_iterations=50):
+    for rollout_num, seed in POSITIONS:
+        state = generate_random_game(rollout_num, seed)
+        for bounded in (True, False):
+            expected, _ = PNS(state, bounded).run()
+            solver = ParallelPNS(state, bounded, workers, job_iterations)
+            assert solver.run()[0] == expected
+            assert solver.worker_iterations > 0
+            # the proofs of the workers reach the master tree through a table of the search
+            assert solver.own_tt and solver.stats.tt_probes > 0
+
+            # a node limit large enough for the proof gives the same result
+            solver = ParallelPNS(state, bounded, workers, job_iterations)
+            solver.node_limit = 10*solver.stats.nodes + 10**5
+            assert solver.run()[0] == expected
+
+            # a small one is split between the jobs instead of being overrun by every worker
+            solver = ParallelPNS(state, bounded, workers, job_iterations)
+            solver.node_limit = 200
+            result, move = solver.run()
+            assert result in (None, expected) and move is not None
+            assert solver.stats.nodes <= solver.node_limit
+
+
+def test_initializers():
+    initializers = [MobilityInitializer(), ThreatInitializer(), ValueInitializer(static_value)]
+    for rollout_num, seed in POSITIONS:
+        state = generate_random_game(rollout_num, seed)
+        for bounded in (True, False):
+            expected, _ = PNS(state, bounded).run()
+            for initializer in initializers:
+                assert PNS(state, bounded, initializer).run()[0] == expected
+
+
+def test_value_orientation(value=0.8):
+    # the value is for the root player, a promising state is easier to prove and harder to disprove
+    pn, dn = value_to_numbers(value, 4.0)
+    assert 1 <= pn < dn
+    assert value_to_numbers(-value, 4.0) == (dn, pn)
+    assert value_to_numbers(0., 4.0)[0] == value_to_numbers(0., 4.0)[1]
+
+    # a value favourable to the player to move lowers pn at or nodes and dn at and nodes
+    initializer = ValueInitializer(lambda state: value)
+    state = generate_random_game(20, 0)
+    player = state['current_player']
+    pn, dn = initializer(state, player)
+    assert pn < dn
+    pn, dn = initializer(state, -player)
+    assert dn < pn
+
+
+def test_neural_initializer():
+    # an untrained network seeds valid numbers, which only change the order of the search
+    params, model_state = init_model(create_model(True))
+    initializer = NeuralInitializer.from_params(params, model_state)
+    state = generate_random_game(40, 0)
+    game = UltimateTTT(None, None, state)
+    moves = list(game.next_valid_moves)
+    states = []
+    for move in moves:
+        game.update_state(move)
+        states.append(game.get_state())
+        game.undo()
+    for root_player in (X, O):
+        numbers = np.array(initializer.batch(state, moves, states, root_player))
+        assert numbers.shape == (len(moves), 2)
+        assert np.all(np.isfinite(numbers)) and np.all(numbers > 0)
+        pn, dn = initializer(states[0], root_player)
+        assert np.isfinite(pn) and np.isfinite(dn) and pn > 0 and dn > 0
+
+    for rollout_num, seed in POSITIONS[:2]:
+        state = generate_random_game(rollout_num, seed)
+        for bounded in (True, False):
+            expected, _ = PNS(state, bounded).run()
+            assert PNS(state, bounded, initializer).run()[0] == expected
+
+    # the initializer is handed to the worker processes, which rebuild the network
+    initializer = pickle.loads(pickle.dumps(initializer))
+    rollout_num, seed = POSITIONS[0]
+    state = generate_random_game(rollout_num, seed)
+    assert ParallelPNS(state, True, 2, 50, initializer).run()[0] == PNS(state, True).run()[0]
+
+
+if __name__ == '__main__':
+    test_parallel_pns()
+    test_initializers()
+    test_value_orientation()
+    test_neural_initializer()
@@ -0,0 +1,50 @@
+from multiprocessing import Event
+
+from env.macros import *
+from solvers.alpha_beta import AlphaBeta
+from solvers.boolean_minimax import BooleanMinimax
+from solvers.negamax import NegaMax
+from solvers.root_split import RootSplit, _init_worker, _score
+from utils.test_utils import generate_random_game
+
+
+def test_root_split(rollout_num=60, seed=2, workers=2):
+    random_state = generate_random_game(rollout_num, seed)
+    for solver_cls in (NegaMax, AlphaBeta):
+        expected = solver_cls(random_state).run()
+        for split_depth in (1, 2):
+            result = RootSplit(solver_cls, random_state,
+                               workers, split_depth).run()
+            assert result == expected, f'{solver_cls.__name__} split at depth {split_depth} disagrees'
+
+    for bounded in (True, False):
+        expected, expected_move = BooleanMinimax(random_state, bounded).run()
+        for split_depth in (1, 2):
+            result, move = RootSplit(BooleanMinimax, random_state, workers,
+                                     split_depth, bounded=bounded).run()
+            assert result == expected, f'BooleanMinimax split at depth {split_depth} disagrees'
+            if result:  # a losing root player picks a random move
+                assert move == expected_move
+
+
+def test_null_window(rollout_num=55, seed=4, workers=2):
+    # the best root move draws, the later moves are searched above the draw
+    random_state = generate_random_game(rollout_num, seed)
+    expected = AlphaBeta(random_state).run()
+    assert expected[0] == 0
+    for split_depth in (1, 2):
+        assert RootSplit(AlphaBeta, random_state, workers, split_depth).run() == expected
+
+    # a null window above a draw tells a win apart from the rest, which are bounded by the draw
+    _init_worker([Event()])
+    for num, position_seed in ((55, 0), (55, 2), (55, 4), (55, 9), (60, 2)):
+        state = generate_random_game(num, position_seed)
+        for player in (X, O):
+            score, _ = _score(AlphaBeta, state, player, None, 0, None)
+            bound, _ = _score(AlphaBeta, state, player, None, 0, None, alpha=0)
+            assert bound == score if score > 0 else score <= bound <= 0
+
+
+if __name__ == '__main__':
+    test_root_split(55, 0)
+    test_null_window()
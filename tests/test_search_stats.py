@@ -0,0 +1,37 @@
+from solvers.alpha_beta import AlphaBeta
+from solvers.boolean_minimax import BooleanMinimax
+from solvers.negamax import NegaMax
+from solvers.pns import PNS
+from solvers.root_split import RootSplit
+from solvers.transposition import TranspositionTable
+from utils.test_utils import generate_random_game
+
+
+def test_search_stats(rollout_num=55, seed=2):
+    random_state = generate_random_game(rollout_num, seed)
+    solvers = [lambda: NegaMax(random_state), lambda: AlphaBeta(random_state, tt=TranspositionTable()),
+               lambda: BooleanMinimax(random_state, True), lambda: PNS(random_state, True)]
+    for create_solver in solvers:
+        reports = []
+        result, move, stats = create_solver().solve(progress=reports.append, progress_interval=0)
+        assert (result, move) == create_solver().run()
+        assert stats.nodes > stats.terminal_hits > 0
+        assert stats.max_depth > 0 and stats.elapsed > 0 and stats.peak_memory > 0
+        # reported every check interval
+        assert len(reports) == stats.nodes // create_solver().check_interval
+
+    stats = AlphaBeta(random_state, tt=TranspositionTable()).solve()[2]
+    assert stats.tt_probes >= stats.tt_hits > 0
+    assert sum(stats.cutoffs.values()) > 0
+
+
+def test_root_split_stats(rollout_num=55, seed=2, workers=2):
+    random_state = generate_random_game(rollout_num, seed)
+    result, move, stats = RootSplit(AlphaBeta, random_state, workers).solve()
+    assert (result, move) == AlphaBeta(random_state).run()
+    assert stats.nodes > 0 and stats.max_depth > 1
+
+
+if __name__ == '__main__':
+    test_search_stats()
+    test_root_split_stats()
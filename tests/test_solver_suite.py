@@ -0,0 +1,31 @@
+from benchmarks.solver_suite import POSITIONS_VERSION, compare, load_positions, run_suite
+
+
+def test_positions():
+    version, positions = load_positions()
+    assert version == POSITIONS_VERSION
+    plies = {len(state['history']) for _, state in positions}
+    assert min(plies) == 45 and max(plies) == 65
+
+
+def test_compare(time_limit=1.0):
+    _, positions = load_positions()
+    positions = [(name, state) for name, state in positions if name == '55-2']
+    records = run_suite(positions, ['alpha_beta', 'pns'], time_limit)
+    assert all(rec['proven'] and rec['nodes'] > 0 and rec['peak_memory'] > 0 for rec in records)
+
+    baseline = {'positions_version': POSITIONS_VERSION, 'records': records}
+    assert compare(baseline, baseline) == []
+
+    slower = [dict(rec, nodes=2*rec['nodes'], seconds=rec['seconds'] + 1) for rec in records]
+    report = {'positions_version': POSITIONS_VERSION, 'records': slower}
+    assert len(compare(report, baseline)) == 2*len(records)
+
+    wrong = [dict(records[0], result=-records[0]['result'])]
+    report = {'positions_version': POSITIONS_VERSION, 'records': wrong}
+    assert len(compare(report, baseline)) == 1
+
+
+if __name__ == '__main__':
+    test_positions()
+    test_compare()
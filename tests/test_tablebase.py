@@ -0,0 +1,46 @@
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from mcts.array_tree import ArrayTree
+from players.mcts_player import MCTSPlayer
+from players.random_player import RandomPlayer
+from solvers.alpha_beta import AlphaBeta
+from solvers.solved_store import SolvedStore
+from solvers.tablebase import build_tablebase, sample_line, work_path
+from utils.hash_utils import hash_state
+
+
+def test_tablebase(tmp_path, max_empty=8, num_games=4, workers=2):
+    path = str(tmp_path / 'tablebase.store')
+    build_tablebase(path, max_empty, num_games, workers)
+    # a second call finds every shard finished
+    assert build_tablebase(path, max_empty, num_games, workers) == 0
+
+    # the shards solve into one store, which is merged into the tablebase
+    tablebase = SolvedStore(path)
+    work = SolvedStore(work_path(path))
+    assert len(work) == len(tablebase) > 0
+    work.close()
+    state = sample_line(max_empty, f'0-{num_games - 1}')[-1]
+    expected = AlphaBeta(state).run()
+    entry = tablebase.probe(hash_state(state))
+    assert entry is not None and entry.is_exact() and entry.value == expected[0]
+    assert AlphaBeta(state, tt=tablebase).run() == expected
+
+    # the roll-outs of MCTS end with the exact outcome
+    if expected[0] == 0:
+        outcome = TIE
+    else:
+        winner = state['current_player']*expected[0]
+        outcome = X_WIN if winner == X else O_WIN
+    tree = ArrayTree(state, RandomPlayer(), 1.4, tablebase)
+    assert tree.roll_out(tree.game.copy(), [])[0] == outcome
+    player = MCTSPlayer(num_simulation=50, tablebase=tablebase)
+    assert player.move(state) in UltimateTTT(None, None, state).next_valid_moves
+    tablebase.close()
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        test_tablebase(pathlib.Path(directory))
@@ -0,0 +1,167 @@
+from multiprocessing import Barrier, Process
+
+from env.macros import *
+from env.ultimate_ttt import UltimateTTT
+from players.alpha_beta_player import AlphaBetaPlayer
+from players.boolean_minimax_player import BooleanMinimaxPlayer
+from players.pns_player import PNSPlayer
+from solvers.alpha_beta import AlphaBeta
+from solvers.boolean_minimax import BooleanMinimax
+from solvers.negamax import NegaMax
+from solvers.pns import PNS
+from solvers.root_split import RootSplit
+from solvers.solved_store import SolvedStore
+from solvers.transposition import (EXACT, SharedTranspositionTable, TranspositionTable,
+                                   TTEntry)
+from utils.test_utils import generate_random_game
+
+
+def assert_optimal(state: dict, result: tuple, expected: int):
+    '''
+    assert that the (score, best move) of a solver is the score of the state and a move that achieves it
+    '''
+    score, move = result
+    assert score == expected
+    game = UltimateTTT(None, None, state)
+    assert move in game.next_valid_moves
+    game.update_state(move)
+    assert -NegaMax(game.get_state()).run()[0] == expected
+
+
+def test_transposition_table(rollout_num=55, seed=2):
+    random_state = generate_random_game(rollout_num, seed)
+    expected, _ = NegaMax(random_state).run()
+
+    # one table shared by every solver
+    tt = TranspositionTable()
+    assert_optimal(random_state, NegaMax(random_state, tt=tt).run(), expected)
+    assert_optimal(random_state, AlphaBeta(random_state, tt=tt).run(), expected)
+    for bounded in (True, False):
+        result = expected >= (0 if bounded else 1)
+        assert BooleanMinimax(random_state, bounded, tt=tt).run()[0] == result
+        assert PNS(random_state, bounded, tt=tt).run()[0] == result
+    assert tt.stats()['hits'] > 0
+
+
+def test_table_without_moves(rollout_num=60, seed=6):
+    # a lost position, whose proofs by the boolean solvers settle the root at once
+    random_state = generate_random_game(rollout_num, seed)
+    expected, _ = NegaMax(random_state).run()
+    assert expected == -1
+
+    # the boolean solvers store their proofs without a best move, the root searches on after such a hit
+    for solver in (AlphaBeta, NegaMax):
+        for boolean_solver in (BooleanMinimax, PNS):
+            tt = TranspositionTable()
+            for bounded in (True, False):
+                boolean_solver(random_state, bounded, tt=tt).run()
+            assert_optimal(random_state, solver(random_state, tt=tt).run(), expected)
+
+    # players sharing one table only make valid moves
+    tt = TranspositionTable()
+    game = UltimateTTT(BooleanMinimaxPlayer(tt=tt), AlphaBetaPlayer(tt=tt), random_state)
+    game.play()
+    assert game.outcome != INCOMPLETE
+
+
+def test_shared_transposition_table(rollout_num=55, seed=2, workers=2):
+    random_state = generate_random_game(rollout_num, seed)
+    expected = AlphaBeta(random_state).run()
+
+    tt = SharedTranspositionTable(size=2**12)
+    try:
+        assert RootSplit(AlphaBeta, random_state, workers, tt=tt).run() == expected
+        assert tt.stats()['stores'] > 0  # written by the workers
+        assert RootSplit(AlphaBeta, random_state, workers, tt=tt).run() == expected
+        assert tt.stats()['hits'] > 0
+    finally:
+        tt.close()
+
+
+def test_solved_store(tmp_path, rollout_num=55, seed=2):
+    random_state = generate_random_game(rollout_num, seed)
+    expected = AlphaBeta(random_state).run()
+    path = str(tmp_path / 'solved.store')
+
+    store = SolvedStore(path, capacity=2**12)
+    assert AlphaBeta(random_state, tt=store).run() == expected
+    size = len(store)
+    assert size > 0
+    store.close()
+
+    # the proofs survive reopening the file
+    store = SolvedStore(path)
+    assert len(store) == size
+    assert AlphaBeta(random_state, tt=store).run() == expected
+    assert NegaMax(random_state, tt=store).run()[0] == expected[0]
+    # the root is answered from the store without a search
+    pns = PNS(random_state, True, tt=store)
+    assert pns.run() == (expected[0] >= 0, expected[1])
+    assert pns.stats.nodes == 0 and pns.stats.proven
+    assert store.stats()['hits'] > 0
+    store.close()
+
+
+def _store_keys(path: str, keys: list, start):
+    store = SolvedStore(path)
+    start.wait()
+    for key in keys:
+        store.store(key, 1, EXACT, key % 81)
+    store.close()
+
+
+def test_solved_store_writers(tmp_path, num_keys=1500, workers=3, capacity=2**13):
+    path = str(tmp_path / 'solved.store')
+    SolvedStore(path, capacity).close()
+    # the processes write into the same file at once, the keys key*4 + copy*capacity of different copies
+    # start at the same slot and every process shares a copy with the next one
+    start = Barrier(workers)
+    processes = [Process(target=_store_keys, args=(path, [key*4 + copy*capacity for key in range(num_keys)
+                                                          for copy in (index, index + 1)], start))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    store = SolvedStore(path)
+    keys = sorted(key*4 + copy*capacity for key in range(num_keys) for copy in range(workers + 1))
+    assert len(store) == len(keys)
+    assert sorted(key for key, _ in store.items()) == keys
+    for key in keys:
+        assert store.probe(key) == TTEntry(1, EXACT, key % 81, 0)
+    store.close()
+
+
+def test_player_keeps_table(rollout_num=45, seed=1):
+    random_state = generate_random_game(rollout_num, seed)
+    for player in (AlphaBetaPlayer(), PNSPlayer(), AlphaBetaPlayer(workers=2), PNSPlayer(workers=2)):
+        # with workers the table lives in shared memory so that the worker processes fill it
+        assert isinstance(player.tt, SharedTranspositionTable) == (player.workers > 1)
+        game = UltimateTTT(player, player, random_state)
+        game.update_state(game.make_move())
+        stores = player.tt.stats()['stores']
+        # the later moves are answered from what the first search proved
+        while game.outcome == INCOMPLETE:
+            game.update_state(game.make_move())
+        assert player.tt.stats()['stores'] - stores < stores
+
+        player.reset()
+        assert player.tt.stats()['probes'] == 0
+        assert isinstance(player.tt, SharedTranspositionTable) == (player.workers > 1)
+        if player.workers > 1:
+            player.tt.close()
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_transposition_table()
+    test_table_without_moves()
+    test_shared_transposition_table()
+    test_player_keeps_table()
+    with tempfile.TemporaryDirectory() as directory:
+        test_solved_store(pathlib.Path(directory))
+    with tempfile.TemporaryDirectory() as directory:
+        test_solved_store_writers(pathlib.Path(directory))
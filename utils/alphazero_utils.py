@@ -12,6 +12,7 @@ from alphazero.edge import Edge
 from alphazero.model import create_model, init_model
 from env.macros import *
 from jax.nn import softmax
+from utils.env_utils import ordinal_to_coordinate
 
 from utils.test_utils import generate_random_game
 
@@ -50,6 +51,63 @@ def create_feature(history: deque, player):
     return feature
 
 
+def state_history(state: dict, length: int = 8):
+    '''
+    rebuild the boards of the last few states by taking back the moves in the history
+    return a deque of states with the given state first, as the alphazero features expect
+    '''
+    inner_board = np.copy(state['inner_board'])
+    history = deque([{'inner_board': np.copy(inner_board)}])
+    for _, move in reversed(state['history'][-(length - 1):]):
+        inner_board[ordinal_to_coordinate(move)] = EMPTY
+        history.append({'inner_board': np.copy(inner_board)})
+    return history
+
+
+class Forward:
+    '''
+    the jitted forward pass of the network in inference mode, from a batch of features to (values, logits)
+    it pickles as the parameters of the network and is jitted again in the receiving process,
+    so the solvers and searches holding it can hand it to worker processes
+    '''
+
+    def __init__(self, model_params, model_state) -> None:
+        self.model_params = model_params
+        self.model_state = model_state
+        model = create_model(training=False)
+
+        def forward(feature):
+            (val, logits), _ = model.apply(model_params, model_state, feature)
+            return val, logits
+        self.forward_func = jax.jit(forward)
+
+    def __call__(self, feature):
+        return self.forward_func(feature)
+
+    def __getstate__(self):
+        return {'model_params': self.model_params, 'model_state': self.model_state}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state['model_params'], state['model_state'])
+
+
+def create_forward(model_params, model_state):
+    '''
+    return the jitted forward pass of the network in inference mode, see Forward
+    '''
+    return Forward(model_params, model_state)
+
+
+def evaluate_states(forward_func, states: list):
+    '''
+    evaluate the states in a single forward pass, their features are rebuilt from their history as in training
+    return (values of the states for their players to move, logits of their moves)
+    '''
+    features = np.concatenate([create_feature(state_history(state), state['current_player']) for state in states])
+    vals, logits = forward_func(jnp.asarray(features))
+    return np.asarray(vals).reshape(-1), np.asarray(logits)
+
+
 def get_val_and_pol(forward_func, feature: np.ndarray, valid_moves):
     feature = jnp.asarray(feature)
     val, logits = forward_func(feature)
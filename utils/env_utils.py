@@ -2,6 +2,16 @@ from termcolor import colored
 import numpy as np
 from env.macros import *
 
+# the sub-board and the position inside it of every slot, sub-boards and positions are numbered row by row
+SUB_BOARD = np.array([(move // 27)*3 + (move % 9) // 3 for move in range(81)])
+POSITION = np.array([((move // 9) % 3)*3 + move % 3 for move in range(81)])
+# the slots of every sub-board in position order
+SLOTS = np.array([[(sub // 3*3 + pos // 3)*9 + sub % 3*3 + pos % 3 for pos in range(9)] for sub in range(9)])
+# the 8 winning lines of a 3x3 board in flattened (row*3 + col) positions
+LINES = np.array([[0, 1, 2], [3, 4, 5], [6, 7, 8],
+                  [0, 3, 6], [1, 4, 7], [2, 5, 8],
+                  [0, 4, 8], [2, 4, 6]])
+
 
 def check_board(board: np.ndarray):
     '''
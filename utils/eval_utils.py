@@ -0,0 +1,95 @@
+import numpy as np
+from env.macros import *
+from utils.env_utils import LINES, SLOTS, inner_to_outer, switch_player
+
+# base-3 place values used to encode a 3x3 board into an integer in [0, 3^9)
+POWERS = 3 ** np.arange(9)
+
+
+def _build_threat_tables():
+    '''
+    enumerate every 3x3 board and count, for each player,
+    the lines holding two of the player's marks and an empty slot
+    return (threats of X, threats of O) indexed by the board encoding
+    '''
+    codes = np.arange(3 ** 9)
+    digits = (codes[:, None] // POWERS) % 3  # 0: empty, 1: X, 2: O
+    lines = digits[:, LINES]
+    empties = np.sum(lines == 0, axis=2)
+    x_threats = np.sum((np.sum(lines == 1, axis=2) == 2) & (empties == 1), axis=1)
+    o_threats = np.sum((np.sum(lines == 2, axis=2) == 2) & (empties == 1), axis=1)
+    return x_threats.astype(np.short), o_threats.astype(np.short)
+
+
+X_THREATS, O_THREATS = _build_threat_tables()
+
+# the weights of a won sub-board, a threat on the outer board and a threat inside a sub-board in the
+# static evaluation, and the scale of the score mapped to [-1, 1], fitted to the mean outcomes of
+# random roll-outs from random middle game positions
+WON_WEIGHT = 3.0
+OUTER_WEIGHT = 4.0
+INNER_WEIGHT = 1.0
+SCALE = 0.05
+
+
+def encode_board(board: np.ndarray):
+    '''
+    board: np.ndarray -- a 3x3 board holding X, O and EMPTY markers
+    return the base-3 encoding of the board used to index the static tables
+    '''
+    digits = np.where(board == O, 2, board == X).reshape(9)
+    return int(np.dot(digits, POWERS))
+
+
+def count_threats(inner_board: np.ndarray, outer_board: np.ndarray, player: int):
+    '''
+    inner_board: np.ndarray -- the inner board of the game
+    outer_board: np.ndarray -- the outer board corresponding to the inner board
+    player: int -- the player to count threats for (X or O)
+    return (threats inside the open sub-boards, threats on the outer board)
+    '''
+    assert player == X or player == O, f'player of value {player} not recognized'
+    table = X_THREATS if player == X else O_THREATS
+
+    # inner threats only matter in sub-boards that are still being played
+    sub_boards = inner_board.reshape(3, 3, 3, 3).swapaxes(1, 2).reshape(9, 3, 3)
+    inner_threats = 0
+    for index, sub_board in enumerate(sub_boards):
+        if outer_board.flat[index] == INCOMPLETE:
+            inner_threats += table[encode_board(sub_board)]
+
+    # a tied sub-board blocks the lines through it, so it counts as the opponent's mark
+    outer = np.full((3, 3), switch_player(player), dtype=np.short)
+    outer[outer_board == player] = player
+    outer[outer_board == INCOMPLETE] = EMPTY
+    outer_threats = table[encode_board(outer)]
+
+    return int(inner_threats), int(outer_threats)
+
+
+def static_values(inner: np.ndarray, outer: np.ndarray):
+    '''
+    inner: np.ndarray -- inner boards flattened row by row to shape (n, 81)
+    outer: np.ndarray -- the corresponding outer boards flattened to shape (n, 9)
+    return the static evaluations of the positions for X in [-1, 1], from the difference in won sub-boards
+    and in two-in-a-row threats on the outer board and inside the open sub-boards
+    '''
+    digits = np.where(inner == O, 2, inner == X)
+    codes = digits[:, SLOTS] @ POWERS
+    open_sub = outer == INCOMPLETE
+    inner_threats = np.sum((X_THREATS[codes] - O_THREATS[codes])*open_sub, axis=1)
+    # a tied sub-board blocks the lines through it, so it counts as the opponent's mark
+    x_outer = X_THREATS[np.where(outer == X, 1, np.where(open_sub, 0, 2)) @ POWERS]
+    o_outer = O_THREATS[np.where(outer == O, 2, np.where(open_sub, 0, 1)) @ POWERS]
+    won = np.sum(outer == X, axis=1) - np.sum(outer == O, axis=1)
+    score = WON_WEIGHT*won + OUTER_WEIGHT*(x_outer - o_outer) + INNER_WEIGHT*inner_threats
+    return np.tanh(SCALE*score)
+
+
+def static_value(state: dict):
+    '''
+    return the static evaluation of the state in [-1, 1] for the player to move, see static_values
+    '''
+    inner_board = state['inner_board']
+    value = static_values(inner_board.reshape(1, 81), inner_to_outer(inner_board).reshape(1, 9))[0]
+    return float(value)*state['current_player']
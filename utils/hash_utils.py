@@ -0,0 +1,58 @@
+import numpy as np
+from env.macros import *
+from utils.env_utils import inner_to_outer
+
+# fixed seed so that every process derives the same keys
+_rng = np.random.default_rng(20221019)
+
+# random bits for a marker of X and of O on each of the 81 slots
+CELL_KEYS = _rng.integers(0, 2**63, size=(81, 2), dtype=np.int64).tolist()
+# random bits for O being the player to move
+PLAYER_KEY = int(_rng.integers(0, 2**63, dtype=np.int64))
+# random bits for the sub-board the player is sent to, index 9 when free to play anywhere
+TARGET_KEYS = _rng.integers(0, 2**63, size=10, dtype=np.int64).tolist()
+
+
+def cell_key(move: int, player: int):
+    '''
+    return the key of the player's marker on the slot
+    '''
+    return CELL_KEYS[move][0 if player == X else 1]
+
+
+def board_hash(inner_board: np.ndarray):
+    '''
+    return the xor of the keys of every marker on the inner board
+    '''
+    key = 0
+    for move, marker in enumerate(inner_board.flat):
+        if marker != EMPTY:
+            key ^= cell_key(move, marker)
+    return key
+
+
+def position_hash(board_key: int, outer_board: np.ndarray, current_player: int, previous_move: int):
+    '''
+    board_key: int -- the hash of the inner board
+    combine the board hash with the player to move and the sub-board the player is sent to,
+    two states with the same hash have the same legal moves whatever the order of the moves
+    '''
+    key = board_key
+    if current_player == O:
+        key ^= PLAYER_KEY
+
+    target = 9
+    if previous_move is not None:
+        row, col = (previous_move // 9) % 3, previous_move % 3
+        if outer_board[row, col] == INCOMPLETE:
+            target = row*3 + col
+    return key ^ TARGET_KEYS[target]
+
+
+def hash_state(state: dict):
+    '''
+    return the position hash of a state dict
+    '''
+    inner_board = state['inner_board']
+    return position_hash(board_hash(inner_board), inner_to_outer(inner_board),
+                         state['current_player'], state['previous_move'])
@@ -0,0 +1,14 @@
+import multiprocessing
+import sys
+
+
+def worker_context():
+    '''
+    return the multiprocessing context of the worker processes of the parallel searches:
+    forking a process after jax started its runtime threads can deadlock the child, so the workers
+    are then forked from a clean server process, else the default context is used
+    '''
+    xla_bridge = sys.modules.get('jax._src.xla_bridge')
+    if xla_bridge is not None and xla_bridge.backends_are_initialized():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()